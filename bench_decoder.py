@@ -0,0 +1,318 @@
+"""Benchmark suite for the Lynx protocol decoder.
+
+Runs without Home Assistant: the decoder module is loaded straight from
+custom_components/euc_monitor/lynx_protocol.py.
+
+Usage: python bench_decoder.py [--frames N] [--seed N] [--memory]
+
+The frames are a simulated ride generated from --seed: values drift like
+they do on a real wheel, SmartBMS firmware cycles through packets 0-7,
+and the stream is cut into BLE sized chunks with some frames corrupted.
+Every line of output is one measurement, always in the same order:
+
+    <stage>  <case>  <us/frame> us/frame  <frames/s> frames/s
+
+Stages:
+    framing  finding frames in BLE chunks, nothing checked or decoded
+    crc      CRC-32 of the frame payloads
+    decode   decode_frame on valid frames
+    publish  the keys that changed since the previous frame, as the
+             coordinator does before notifying sensors
+    feed     BLE chunks to records, framing, CRC and decode together
+
+Rates are per valid frame in the stream, so corrupted frames count as
+overhead.
+
+--memory checks that decoding a long stream allocates nothing that
+outlives a frame, which would otherwise show up as garbage collector
+churn on small hosts, and exits with status 1 if it does.
+"""
+import argparse
+import gc
+import importlib.util
+import os
+import random
+import struct
+import sys
+import time
+import tracemalloc
+
+PROTOCOL_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "custom_components",
+    "euc_monitor",
+    "lynx_protocol.py",
+)
+
+# Firmware versions benchmarked, mVer 5 and up sends SmartBMS packets
+FIRMWARE_VERSIONS = {"mVer 4": 4005, "mVer 5": 5012}
+# 20 bytes is the default BLE payload, 244 the largest with BLE 4.2+
+CHUNK_SIZES = (20, 64, 244)
+CORRUPT_RATE = 0.01  # Share of frames damaged in the corrupted cases
+
+
+def load_protocol():
+    spec = importlib.util.spec_from_file_location("lynx_protocol", PROTOCOL_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def generate_frames(protocol, count, version=5012, pnums=range(8), length=None, seed=0):
+    """Return count valid frames of a simulated ride.
+
+    length is the frame length byte, 90 for SmartBMS firmware and 44
+    otherwise by default. SmartBMS frames cycle through pnums.
+    """
+    rng = random.Random(seed)
+    smart_bms = version // 1000 >= 5
+    if length is None:
+        length = 90 if smart_bms else 44
+    pnums = tuple(pnums)
+    speed = 0  # 0.1 km/h
+    current = 0  # 0.1 A
+    pitch = 0  # 0.01 deg
+    voltage = 10080  # 0.01 V
+    trip = 0  # m
+    total = 1234567  # m
+    temperature = 3500  # 0.01 C
+    cells = {bms: [3900 + rng.randrange(40) for _ in range(42)] for bms in (1, 2)}
+    temps = {bms: [2500 + rng.randrange(300) for _ in range(6)] for bms in (1, 2)}
+    bms_currents = [0, 0]
+
+    frames = []
+    for i in range(count):
+        speed = max(-50, min(450, speed + rng.randint(-8, 9)))
+        current = max(-300, min(600, current + rng.randint(-20, 20)))
+        pitch = max(-1500, min(1500, pitch + rng.randint(-30, 30)))
+        if rng.random() < 0.05:
+            voltage -= 1
+        trip += abs(speed) // 36
+        total += abs(speed) // 36
+        if rng.random() < 0.01:
+            temperature += rng.choice((-1, 1))
+
+        frame = bytearray(length)
+        frame[0:4] = protocol.FRAME_HEADER + bytes([length])
+        struct.pack_into(">hh", frame, 4, voltage, speed)
+        # Distances are sent with their 16 bit words swapped
+        struct.pack_into(">HH", frame, 8, trip & 0xFFFF, trip >> 16)
+        struct.pack_into(">HH", frame, 12, total & 0xFFFF, total >> 16)
+        struct.pack_into(
+            ">hHhhhhhhhh",
+            frame,
+            16,
+            current,
+            temperature,
+            900,  # Auto off
+            0,  # Charge mode
+            45,  # Speed alert
+            50,  # Tiltback speed
+            version,
+            1,  # Ride mode
+            pitch,
+            abs(current) // 2,  # HPWM
+        )
+
+        if smart_bms and length > 46:
+            pnum = pnums[i % len(pnums)]
+            bms = 1 if pnum < 4 else 2
+            frame[46] = pnum
+            # Cells drift by a millivolt now and then
+            if rng.random() < 0.05:
+                cell = rng.randrange(42)
+                cells[bms][cell] += rng.choice((-1, 1))
+            packet = pnum % 4
+            if packet == 0 and length > 72:
+                bms_currents[0] = current * 5
+                bms_currents[1] = current * 5 + rng.randint(-3, 3)
+                struct.pack_into(">hh", frame, 69, *bms_currents)
+            elif packet in (1, 2):
+                first = 0 if packet == 1 else 15
+                for n in range(min(15, (length - 53) // 2)):
+                    struct.pack_into(">H", frame, 53 + 2 * n, cells[bms][first + n])
+            elif packet == 3:
+                if length > 59:
+                    struct.pack_into(">6h", frame, 47, *temps[bms])
+                for n in range(min(12, (length - 59) // 2)):
+                    struct.pack_into(">H", frame, 59 + 2 * n, cells[bms][30 + n])
+
+        frames.append(
+            bytes(frame) + protocol.CRC_STRUCT.pack(protocol.calculate_crc32(frame))
+        )
+    return frames
+
+
+def corrupt_frame(frame, rng):
+    """Return the frame damaged the way a lossy BLE link damages frames."""
+    kind = rng.randrange(3)
+    if kind == 0:
+        # Flipped byte, fails the CRC
+        pos = rng.randrange(4, len(frame))
+        return frame[:pos] + bytes([frame[pos] ^ 0xFF]) + frame[pos + 1 :]
+    if kind == 1:
+        # Lost tail, the length byte swallows part of the next frame
+        return frame[: rng.randrange(4, len(frame))]
+    # Noise ahead of the frame
+    return bytes(rng.randrange(256) for _ in range(rng.randrange(1, 20))) + frame
+
+
+def chunk_stream(frames, chunk_size, corrupt_rate=0.0, seed=0):
+    """Join frames into a stream cut into BLE chunks, corrupting some."""
+    rng = random.Random(seed)
+    stream = b"".join(
+        corrupt_frame(frame, rng) if rng.random() < corrupt_rate else frame
+        for frame in frames
+    )
+    return [stream[i : i + chunk_size] for i in range(0, len(stream), chunk_size)]
+
+
+def build_stream(protocol, count):
+    # SmartBMS ride at full frame length, as one contiguous stream
+    return b"".join(generate_frames(protocol, count))
+
+
+def check_memory(protocol, count, chunk_size=20):
+    data = build_stream(protocol, count)
+    chunks = [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
+    warmup = len(chunks) // 10
+    decoder = protocol.LynxDecoder()
+    for chunk in chunks[:warmup]:
+        decoder.process_data(chunk)
+
+    collections = []
+
+    def on_gc(phase, info):
+        if phase == "start":
+            collections.append(info["generation"])
+
+    gc.collect()
+    gc.callbacks.append(on_gc)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for i in range(warmup, len(chunks)):
+        decoder.process_data(chunks[i])
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.callbacks.remove(on_gc)
+
+    frames = count - count * warmup // len(chunks)
+    retained = (current - base) / frames
+    print(
+        f"memory: {retained:.2f} bytes/frame retained, "
+        f"{peak - base} bytes peak, {len(collections)} gc collections "
+        f"over {frames} frames"
+    )
+    return retained < 1 and not collections
+
+
+def bench_framing(protocol, chunks):
+    class FramingDecoder(protocol.LynxDecoder):
+        __slots__ = ()
+
+        def process_frame(self, frame, timestamp=None):
+            return None
+
+    decoder = FramingDecoder()
+    feed = decoder.feed
+    start = time.perf_counter()
+    for chunk in chunks:
+        feed(chunk, 0.0)
+    return time.perf_counter() - start
+
+
+def bench_crc(protocol, frames):
+    calculate_crc32 = protocol.calculate_crc32
+    payloads = [memoryview(frame)[:-4] for frame in frames]
+    start = time.perf_counter()
+    for payload in payloads:
+        calculate_crc32(payload)
+    return time.perf_counter() - start
+
+
+def bench_decode(protocol, frames, keys=None):
+    decoder = protocol.LynxDecoder()
+    decoder.set_keys(keys)
+    decode_frame = decoder.decode_frame
+    start = time.perf_counter()
+    for frame in frames:
+        decode_frame(frame, 0.0)
+    return time.perf_counter() - start
+
+
+def bench_publish(protocol, frames, keys=None):
+    decoder = protocol.LynxDecoder()
+    decoder.set_keys(keys)
+    records = [decoder.decode_frame(frame, 0.0) for frame in frames]
+    # Sensors only exist for keys the wheel reports
+    keys = sorted(set(records[-1]) if keys is None else keys.intersection(records[-1]))
+    previous = records[0]
+    start = time.perf_counter()
+    for record in records:
+        for key in [key for key in keys if record.differs(previous, key)]:
+            record[key]  # Read by the sensor
+        previous = record
+    return time.perf_counter() - start
+
+
+def bench_feed(protocol, chunks, keys=None):
+    decoder = protocol.LynxDecoder()
+    decoder.set_keys(keys)
+    feed = decoder.feed
+    start = time.perf_counter()
+    for chunk in chunks:
+        feed(chunk, 0.0)
+    return time.perf_counter() - start
+
+
+def report(stage, case, elapsed, frames):
+    print(
+        f"{stage:<8} {case:<36} {elapsed / frames * 1e6:9.3f} us/frame "
+        f"{frames / elapsed:11.0f} frames/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=100000, help="Frames per run")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the ride")
+    parser.add_argument(
+        "--memory", action="store_true", help="Check allocations instead of speed"
+    )
+    args = parser.parse_args()
+
+    protocol = load_protocol()
+    if args.memory:
+        sys.exit(0 if check_memory(protocol, args.frames) else 1)
+
+    # Default entities: no individual cells or BMS temperatures
+    summary_keys = protocol.FRAME_KEYS.union(
+        f"bms{bms}_{name}"
+        for bms in (1, 2)
+        for name in (*protocol.BMS_AGGREGATES, "current")
+    )
+    count = args.frames
+    for firmware, version in FIRMWARE_VERSIONS.items():
+        frames = generate_frames(protocol, count, version, seed=args.seed)
+        key_sets = {"all keys": None}
+        if version // 1000 >= 5:
+            key_sets["summary keys"] = summary_keys
+
+        report("crc", firmware, bench_crc(protocol, frames), count)
+        for name, keys in key_sets.items():
+            case = f"{firmware}, {name}"
+            report("decode", case, bench_decode(protocol, frames, keys), count)
+            report("publish", case, bench_publish(protocol, frames, keys), count)
+
+        streams = [(f"chunk {size}", size, 0.0) for size in CHUNK_SIZES]
+        size = CHUNK_SIZES[0]
+        streams.append((f"chunk {size}, {CORRUPT_RATE:.0%} corrupt", size, CORRUPT_RATE))
+        for name, size, rate in streams:
+            chunks = chunk_stream(frames, size, rate, args.seed)
+            case = f"{firmware}, {name}"
+            report("framing", case, bench_framing(protocol, chunks), count)
+            report("feed", case, bench_feed(protocol, chunks), count)
+
+
+if __name__ == "__main__":
+    main()
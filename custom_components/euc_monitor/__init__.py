@@ -6,9 +6,18 @@ import logging
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
 
-from .const import CONF_MAC_ADDRESS, DOMAIN
+from .const import (
+    CAPABILITIES_STORAGE_VERSION,
+    CONF_MAC_ADDRESS,
+    CONF_MAX_SESSIONS,
+    DEFAULT_MAX_SESSIONS,
+    DOMAIN,
+    FLEET_DATA_KEY,
+)
 from .coordinator import EUCDataUpdateCoordinator
+from .fleet import FleetManager
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,23 +28,60 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up EUC Monitor from a config entry."""
     mac_address = entry.data.get(CONF_MAC_ADDRESS)
 
-    coordinator = EUCDataUpdateCoordinator(hass, mac_address)
+    # One fleet manager shares the BLE session slots between all wheels
+    fleet: FleetManager | None = hass.data.get(FLEET_DATA_KEY)
+    if fleet is None:
+        fleet = hass.data[FLEET_DATA_KEY] = FleetManager()
 
-    # Fetch initial data
-    await coordinator.async_config_entry_first_refresh()
+    coordinator = EUCDataUpdateCoordinator(
+        hass, mac_address, entry.options, fleet, _capabilities_store(hass, entry)
+    )
+    await coordinator.async_load_capabilities()
+    fleet.register(
+        coordinator, entry.options.get(CONF_MAX_SESSIONS, DEFAULT_MAX_SESSIONS)
+    )
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    # Connect in the background so setup does not wait for a wheel that is
+    # off; sensors show their restored values until data arrives
+    entry.async_create_background_task(
+        hass, coordinator.async_start(), f"{DOMAIN} connect {mac_address}"
+    )
+
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
     return True
 
 
+def _capabilities_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Return the store of data keys and firmware seen from a wheel."""
+    return Store(hass, CAPABILITIES_STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         coordinator: EUCDataUpdateCoordinator = hass.data[DOMAIN].pop(entry.entry_id)
         await coordinator.async_shutdown()
 
+        fleet: FleetManager = hass.data[FLEET_DATA_KEY]
+        fleet.unregister(coordinator)
+        if not fleet.wheels:
+            fleet.shutdown()
+            hass.data.pop(FLEET_DATA_KEY)
+
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored capabilities of a deleted entry."""
+    await _capabilities_store(hass, entry).async_remove()
@@ -0,0 +1,169 @@
+"""Compact binary capture of raw BLE notifications.
+
+A capture file starts with a header holding the wall clock and monotonic
+time it was started at, followed by one record per notification: the
+time.monotonic_ns() receive time, the payload length and the raw bytes.
+Monotonic times can be mapped to wall clock time through the header.
+
+This module does not depend on Home Assistant, so the CLI reader can
+record and replay captures as well.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator
+import mmap
+import os
+import struct
+import threading
+import time
+
+CAPTURE_MAGIC = b"EUCCAP"
+CAPTURE_VERSION = 1
+# Magic, version, wall clock ns, monotonic ns at the start of the file
+CAPTURE_HEADER = struct.Struct("<6sBxQQ")
+# Receive time (monotonic ns) and payload length
+CAPTURE_RECORD = struct.Struct("<QH")
+
+
+class CaptureRecorder:
+    """Append raw notifications to a capture file.
+
+    record() only appends to an in-memory batch and is safe to call from
+    the event loop. flush() does the file I/O and is meant to run in an
+    executor thread. Once the file would grow past max_bytes it is
+    rotated like a logging RotatingFileHandler: path.1 is the previous
+    file, up to backup_count files are kept. A file left by an earlier
+    run is rotated the same way on the first flush, so every file starts
+    with the header of the run that wrote it.
+    """
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int) -> None:
+        """Initialize the recorder, no I/O happens until the first flush."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._pending = bytearray()
+        self._lock = threading.Lock()  # Guards _pending between threads
+        self._file = None
+        self._size = 0
+
+    def record(self, data: bytes, timestamp_ns: int | None = None) -> None:
+        """Queue one notification for writing."""
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        with self._lock:
+            self._pending += CAPTURE_RECORD.pack(timestamp_ns, len(data))
+            self._pending += data
+
+    def flush(self) -> None:
+        """Write the queued notifications, blocking."""
+        with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, bytearray()
+
+        if self._file is not None and self._size + len(batch) > self.max_bytes:
+            self._rotate()
+        if self._file is None:
+            self._open()
+        self._file.write(batch)
+        self._file.flush()
+        self._size += len(batch)
+
+    def close(self) -> None:
+        """Write what is queued and close the file, blocking."""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self) -> None:
+        """Start a new capture file with its header."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Monotonic times of an earlier run do not match this header
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            self._rotate()
+        self._file = open(self.path, "wb")  # pylint: disable=consider-using-with
+        self._file.write(
+            CAPTURE_HEADER.pack(
+                CAPTURE_MAGIC,
+                CAPTURE_VERSION,
+                time.time_ns(),
+                time.monotonic_ns(),
+            )
+        )
+        self._size = CAPTURE_HEADER.size
+
+    def _rotate(self) -> None:
+        """Move the current file to path.1, shifting older backups up."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.backup_count < 1:
+            os.remove(self.path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+class CaptureReader:
+    """Read a capture file through a memory map.
+
+    Iterating yields (monotonic ns, bytes) per notification without
+    loading the file into memory. A record cut short at the end of the
+    file, as left by a crash during a write, is ignored.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open the capture file and check its header."""
+        self._file = open(path, "rb")  # pylint: disable=consider-using-with
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < CAPTURE_HEADER.size:
+                raise ValueError(f"{path} is not a capture file")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, wall_ns, monotonic_ns = CAPTURE_HEADER.unpack_from(
+                self._map
+            )
+            if magic != CAPTURE_MAGIC:
+                raise ValueError(f"{path} is not a capture file")
+            if version != CAPTURE_VERSION:
+                raise ValueError(f"Unsupported capture version {version}")
+        except Exception:
+            self.close()
+            raise
+        self.wall_ns = wall_ns  # time.time_ns() when the file was started
+        self.monotonic_ns = monotonic_ns  # time.monotonic_ns() at that moment
+
+    def __enter__(self) -> CaptureReader:
+        """Use the reader as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Close the reader."""
+        self.close()
+
+    def __iter__(self) -> Iterator[tuple[int, bytes]]:
+        """Yield the receive time and payload of every notification."""
+        mapped = self._map
+        end = len(mapped)
+        pos = CAPTURE_HEADER.size
+        while pos + CAPTURE_RECORD.size <= end:
+            timestamp_ns, length = CAPTURE_RECORD.unpack_from(mapped, pos)
+            pos += CAPTURE_RECORD.size
+            if pos + length > end:
+                break
+            yield timestamp_ns, mapped[pos : pos + length]
+            pos += length
+
+    def close(self) -> None:
+        """Release the memory map and the file."""
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
@@ -10,9 +10,28 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_MAC
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 
-from .const import CONF_MAC_ADDRESS, DOMAIN, EUC_SERVICE_UUID
+from .const import (
+    CONF_CAPTURE,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_MAC_ADDRESS,
+    CONF_MAX_SESSIONS,
+    CONF_MIN_INTERVAL,
+    CONF_PUBLISH_RATE_IDLE,
+    CONF_PUBLISH_RATE_RIDING,
+    DEADBAND_OPTIONS,
+    DEFAULT_CAPTURE,
+    DEFAULT_HEARTBEAT_INTERVAL,
+    DEFAULT_MAX_SESSIONS,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_PUBLISH_RATE_IDLE,
+    DEFAULT_PUBLISH_RATE_RIDING,
+    DOMAIN,
+    EUC_SERVICE_UUID,
+    SENSOR_TYPES,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,6 +45,14 @@ class EUCMonitorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Initialize the config flow."""
         self._discovered_devices: dict[str, str] = {}
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> EUCMonitorOptionsFlow:
+        """Get the options flow for this handler."""
+        return EUCMonitorOptionsFlow(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -130,3 +157,60 @@ class EUCMonitorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         # MAC address can be in format XX:XX:XX:XX:XX:XX or XX-XX-XX-XX-XX-XX
         mac_pattern = re.compile(r"^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$")
         return bool(mac_pattern.match(mac))
+
+
+class EUCMonitorOptionsFlow(config_entries.OptionsFlow):
+    """Handle EUC Monitor options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage publish rate, BLE session, state write filtering and capture options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        schema = {
+            vol.Optional(
+                CONF_PUBLISH_RATE_IDLE,
+                default=options.get(CONF_PUBLISH_RATE_IDLE, DEFAULT_PUBLISH_RATE_IDLE),
+            ): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=50)),
+            vol.Optional(
+                CONF_PUBLISH_RATE_RIDING,
+                default=options.get(
+                    CONF_PUBLISH_RATE_RIDING, DEFAULT_PUBLISH_RATE_RIDING
+                ),
+            ): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=50)),
+            vol.Optional(
+                CONF_MAX_SESSIONS,
+                default=options.get(CONF_MAX_SESSIONS, DEFAULT_MAX_SESSIONS),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        }
+        for option, sensor_keys in DEADBAND_OPTIONS.items():
+            default = SENSOR_TYPES[sensor_keys[0]].get("deadband", 0)
+            schema[vol.Optional(option, default=options.get(option, default))] = vol.All(
+                vol.Coerce(float), vol.Range(min=0)
+            )
+        schema[
+            vol.Optional(
+                CONF_MIN_INTERVAL,
+                default=options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+            )
+        ] = vol.All(vol.Coerce(float), vol.Range(min=0))
+        schema[
+            vol.Optional(
+                CONF_HEARTBEAT_INTERVAL,
+                default=options.get(CONF_HEARTBEAT_INTERVAL, DEFAULT_HEARTBEAT_INTERVAL),
+            )
+        ] = vol.All(vol.Coerce(float), vol.Range(min=1))
+        schema[
+            vol.Optional(
+                CONF_CAPTURE, default=options.get(CONF_CAPTURE, DEFAULT_CAPTURE)
+            )
+        ] = bool
+
+        return self.async_show_form(step_id="init", data_schema=vol.Schema(schema))
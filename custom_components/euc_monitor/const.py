@@ -9,14 +9,74 @@ EUC_CHARACTERISTIC_UUID = "0000ffe1-0000-1000-8000-00805f9b34fb"
 # Configuration
 CONF_MAC_ADDRESS = "mac_address"
 
-# Update interval
-UPDATE_INTERVAL = 1  # seconds
+# Connection
+CONNECT_TIMEOUT = 30  # seconds
+# Delay between reconnect attempts while disconnected, doubling per failed
+# attempt. Advertisements from the wheel trigger an attempt right away.
+RECONNECT_BACKOFF_MIN = 2  # seconds
+RECONNECT_BACKOFF_MAX = 300  # seconds
+
+# Options
+CONF_MIN_INTERVAL = "min_interval"
+CONF_HEARTBEAT_INTERVAL = "heartbeat_interval"
+DEFAULT_MIN_INTERVAL = 0  # seconds, applied on top of per-sensor intervals
+DEFAULT_HEARTBEAT_INTERVAL = 300  # seconds
+CONF_PUBLISH_RATE_IDLE = "publish_rate_idle"
+CONF_PUBLISH_RATE_RIDING = "publish_rate_riding"
+DEFAULT_PUBLISH_RATE_IDLE = 2  # Hz
+DEFAULT_PUBLISH_RATE_RIDING = 5  # Hz
+
+CONF_MAX_SESSIONS = "max_sessions"
+DEFAULT_MAX_SESSIONS = 3  # Concurrent BLE sessions across all wheels
+
+# Raw notification capture, see capture.py
+CONF_CAPTURE = "capture"
+DEFAULT_CAPTURE = False
+CAPTURE_DIR = f"{DOMAIN}_captures"  # Relative to the configuration directory
+CAPTURE_FLUSH_INTERVAL = 5  # seconds
+CAPTURE_MAX_BYTES = 16 * 1024 * 1024  # Rotate capture files at this size
+CAPTURE_BACKUP_COUNT = 5  # Rotated capture files kept per wheel
+
+# Fleet manager, shared by all wheels of one Home Assistant instance
+FLEET_DATA_KEY = f"{DOMAIN}_fleet"
+FLEET_IDLE_SESSION_TIME = 60  # seconds an idle wheel keeps its slot when others wait
+FLEET_ROTATE_INTERVAL = 5  # seconds between checks for idle wheels to rotate out
+FLEET_PUBLISH_INTERVAL = 5  # seconds, fleet sensors are updated at most this often
+FLEET_DEVICE_ID = "fleet"
+
+# Data keys and firmware seen per wheel, so entities of features the wheel
+# does not have are not created
+CAPABILITIES_STORAGE_VERSION = 1
+CAPABILITIES_SAVE_DELAY = 10  # seconds
+
+HEALTH_UPDATE_INTERVAL = 30  # seconds between link health diagnostic updates
+
+# Publish rate limiting
+RIDING_SPEED = 1.0  # km/h, at or above this the riding publish rate applies
+# Changes of these keys are published immediately, bypassing the rate limit
+PUBLISH_BYPASS_KEYS = ("charge_mode", "ride_mode", "speed_alert", "speed_tiltback")
+
+# Selective decoding: besides the keys of enabled sensors, the decoder
+# always computes the keys the coordinator and the fleet totals use
+COORDINATOR_KEYS = ("speed", "charge_mode", "version", *PUBLISH_BYPASS_KEYS)
+FLEET_INPUT_KEYS = (
+    "total_distance",
+    "charge_mode",
+    "voltage",
+    "bms1_delta",
+    "bms2_delta",
+)
 
 # Device info
 MANUFACTURER = "Leaperkim"
 MODEL = "Veteran Lynx"
 
-# Sensor definitions with entity_enabled_default flag
+# Sensor definitions with entity_enabled_default flag.
+# Optional state write filtering: changes smaller than "deadband" (absolute)
+# or "deadband_rel" (relative to the last written value) are held back
+# until the heartbeat interval has passed, and writes are at least
+# "min_interval" seconds apart. A held back value is written by a timer
+# once it is due, even if the wheel sends nothing new.
 SENSOR_TYPES = {
     # Core sensors (enabled by default)
     "voltage": {
@@ -26,6 +86,7 @@ SENSOR_TYPES = {
         "device_class": "voltage",
         "state_class": "measurement",
         "enabled_default": True,
+        "deadband": 0.05,
     },
     "speed": {
         "name": "Speed",
@@ -34,6 +95,7 @@ SENSOR_TYPES = {
         "device_class": "speed",
         "state_class": "measurement",
         "enabled_default": True,
+        "deadband": 0.15,
     },
     "current": {
         "name": "Current",
@@ -42,6 +104,7 @@ SENSOR_TYPES = {
         "device_class": "current",
         "state_class": "measurement",
         "enabled_default": True,
+        "deadband": 0.15,
     },
     "temperature": {
         "name": "Temperature",
@@ -57,6 +120,7 @@ SENSOR_TYPES = {
         "icon": "mdi:angle-acute",
         "state_class": "measurement",
         "enabled_default": True,
+        "deadband": 0.05,
     },
     "trip_distance": {
         "name": "Trip Distance",
@@ -82,6 +146,7 @@ SENSOR_TYPES = {
         "device_class": "voltage",
         "state_class": "measurement",
         "enabled_default": True,
+        "deadband": 0.05,
     },
     "bms1_min_cell": {
         "name": "BMS 1 Min Cell",
@@ -90,6 +155,7 @@ SENSOR_TYPES = {
         "device_class": "voltage",
         "state_class": "measurement",
         "enabled_default": False,
+        "deadband": 0.005,
     },
     "bms1_max_cell": {
         "name": "BMS 1 Max Cell",
@@ -98,6 +164,7 @@ SENSOR_TYPES = {
         "device_class": "voltage",
         "state_class": "measurement",
         "enabled_default": False,
+        "deadband": 0.005,
     },
     "bms1_avg_cell": {
         "name": "BMS 1 Avg Cell",
@@ -106,6 +173,7 @@ SENSOR_TYPES = {
         "device_class": "voltage",
         "state_class": "measurement",
         "enabled_default": False,
+        "deadband": 0.005,
     },
     "bms1_delta": {
         "name": "BMS 1 Delta",
@@ -122,6 +190,7 @@ SENSOR_TYPES = {
         "device_class": "voltage",
         "state_class": "measurement",
         "enabled_default": True,
+        "deadband": 0.05,
     },
     "bms2_min_cell": {
         "name": "BMS 2 Min Cell",
@@ -130,6 +199,7 @@ SENSOR_TYPES = {
         "device_class": "voltage",
         "state_class": "measurement",
         "enabled_default": False,
+        "deadband": 0.005,
     },
     "bms2_max_cell": {
         "name": "BMS 2 Max Cell",
@@ -138,6 +208,7 @@ SENSOR_TYPES = {
         "device_class": "voltage",
         "state_class": "measurement",
         "enabled_default": False,
+        "deadband": 0.005,
     },
     "bms2_avg_cell": {
         "name": "BMS 2 Avg Cell",
@@ -146,6 +217,7 @@ SENSOR_TYPES = {
         "device_class": "voltage",
         "state_class": "measurement",
         "enabled_default": True,
+        "deadband": 0.005,
     },
     "bms2_delta": {
         "name": "BMS 2 Delta",
@@ -162,6 +234,7 @@ SENSOR_TYPES = {
         "icon": "mdi:gauge",
         "state_class": "measurement",
         "enabled_default": False,
+        "deadband": 0.5,
     },
     "ride_mode": {
         "name": "Ride Mode",
@@ -205,6 +278,7 @@ SENSOR_TYPES = {
         "device_class": "current",
         "state_class": "measurement",
         "enabled_default": True,
+        "deadband": 0.05,
     },
     "bms2_current": {
         "name": "BMS 2 Current",
@@ -213,6 +287,7 @@ SENSOR_TYPES = {
         "device_class": "current",
         "state_class": "measurement",
         "enabled_default": True,
+        "deadband": 0.05,
     },
 }
 
@@ -226,6 +301,8 @@ for bms in [1, 2]:
             "device_class": "temperature",
             "state_class": "measurement",
             "enabled_default": False,
+            "deadband": 0.5,
+            "min_interval": 10,
         }
 
 # Individual cell voltages (disabled by default)
@@ -238,4 +315,139 @@ for bms in [1, 2]:
             "device_class": "voltage",
             "state_class": "measurement",
             "enabled_default": False,
+            "deadband": 0.005,
+            "min_interval": 5,
         }
+
+# All cell voltages of a BMS in one entity (disabled by default). The state
+# is the number of cells reporting, the raw millivolts are an attribute that
+# is written once per BMS packet cycle and kept out of the recorder.
+for bms in [1, 2]:
+    SENSOR_TYPES[f"bms{bms}_cells"] = {
+        "name": f"BMS {bms} Cells",
+        "icon": "mdi:battery",
+        "enabled_default": False,
+        "packed": True,
+    }
+
+# Deadband options and the sensors each one overrides
+DEADBAND_OPTIONS = {
+    "speed_deadband": ["speed"],
+    "current_deadband": ["current"],
+    "pitch_angle_deadband": ["pitch_angle"],
+    "cell_deadband": [
+        key
+        for key in SENSOR_TYPES
+        if key.startswith("bms")
+        and "cell" in key
+        and not key.endswith(("_delta", "_cells"))
+    ],
+}
+
+# Diagnostic sensors backed by the coordinator's diagnostics
+DIAGNOSTIC_SENSOR_TYPES = {
+    "first_frame_latency": {
+        "name": "Connect to First Frame",
+        "unit": "ms",
+        "icon": "mdi:timer-sand",
+        "device_class": "duration",
+        "state_class": "measurement",
+        "enabled_default": True,
+    },
+    # Link health, counted since the integration was loaded
+    "notification_rate": {
+        "name": "BLE Notification Rate",
+        "unit": "Hz",
+        "icon": "mdi:bluetooth-transfer",
+        "state_class": "measurement",
+        "enabled_default": True,
+    },
+    "frame_jitter": {
+        "name": "Frame Jitter",
+        "unit": "ms",
+        "icon": "mdi:chart-bell-curve",
+        "device_class": "duration",
+        "state_class": "measurement",
+        "enabled_default": True,
+    },
+    "crc_errors": {
+        "name": "CRC Errors",
+        "icon": "mdi:alert-circle-outline",
+        "state_class": "total_increasing",
+        "enabled_default": True,
+    },
+    "bytes_discarded": {
+        "name": "Bytes Discarded",
+        "unit": "B",
+        "icon": "mdi:delete-outline",
+        "device_class": "data_size",
+        "state_class": "total_increasing",
+        "enabled_default": True,
+    },
+    "header_resyncs": {
+        "name": "Header Resyncs",
+        "icon": "mdi:sync-alert",
+        "state_class": "total_increasing",
+        "enabled_default": False,
+    },
+    "short_frames": {
+        "name": "Short Frames",
+        "icon": "mdi:content-cut",
+        "state_class": "total_increasing",
+        "enabled_default": False,
+    },
+    "frames_decoded": {
+        "name": "Frames Decoded",
+        "icon": "mdi:counter",
+        "state_class": "total_increasing",
+        "enabled_default": False,
+    },
+    "bytes_received": {
+        "name": "BLE Bytes Received",
+        "unit": "B",
+        "icon": "mdi:download-network",
+        "device_class": "data_size",
+        "state_class": "total_increasing",
+        "enabled_default": False,
+    },
+}
+
+# Fleet totals across all wheels, shown on a separate "EUC Fleet" device
+FLEET_SENSOR_TYPES = {
+    "fleet_total_distance": {
+        "name": "Fleet Total Distance",
+        "unit": "km",
+        "icon": "mdi:counter",
+        "device_class": "distance",
+        "state_class": "total_increasing",
+        "enabled_default": True,
+    },
+    "fleet_wheels_online": {
+        "name": "Fleet Wheels Online",
+        "icon": "mdi:bluetooth-connect",
+        "state_class": "measurement",
+        "enabled_default": True,
+    },
+    "fleet_wheels_charging": {
+        "name": "Fleet Wheels Charging",
+        "icon": "mdi:battery-charging",
+        "state_class": "measurement",
+        "enabled_default": True,
+    },
+    "fleet_min_voltage": {
+        "name": "Fleet Min Battery Voltage",
+        "unit": "V",
+        "icon": "mdi:battery-low",
+        "device_class": "voltage",
+        "state_class": "measurement",
+        "enabled_default": True,
+    },
+    "fleet_max_cell_delta": {
+        "name": "Fleet Max Cell Delta",
+        "unit": "V",
+        "icon": "mdi:delta",
+        "device_class": "voltage",
+        "state_class": "measurement",
+        "enabled_default": True,
+    },
+}
@@ -2,18 +2,47 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import Callable, Mapping
 from datetime import timedelta
 import logging
+import random
+import time
 from typing import Any
 
 from bleak import BleakClient
-from bleak_retry_connector import establish_connection
+from bleak_retry_connector import BleakClientWithServiceCache, establish_connection
 from homeassistant.components import bluetooth
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
-from .const import DOMAIN, EUC_CHARACTERISTIC_UUID, EUC_SERVICE_UUID, UPDATE_INTERVAL
-from .lynx_protocol import LynxDecoder
+from .capture import CaptureRecorder
+from .const import (
+    CAPABILITIES_SAVE_DELAY,
+    CAPTURE_BACKUP_COUNT,
+    CAPTURE_DIR,
+    CAPTURE_FLUSH_INTERVAL,
+    CAPTURE_MAX_BYTES,
+    CONF_CAPTURE,
+    CONNECT_TIMEOUT,
+    COORDINATOR_KEYS,
+    CONF_PUBLISH_RATE_IDLE,
+    CONF_PUBLISH_RATE_RIDING,
+    DEFAULT_PUBLISH_RATE_IDLE,
+    DEFAULT_PUBLISH_RATE_RIDING,
+    DOMAIN,
+    EUC_CHARACTERISTIC_UUID,
+    EUC_SERVICE_UUID,
+    FLEET_INPUT_KEYS,
+    HEALTH_UPDATE_INTERVAL,
+    PUBLISH_BYPASS_KEYS,
+    RECONNECT_BACKOFF_MAX,
+    RECONNECT_BACKOFF_MIN,
+    RIDING_SPEED,
+)
+from .fleet import FleetManager
+from .lynx_protocol import DECODER_KEYS, FrameRecord, LynxDecoder
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -25,48 +54,165 @@ class EUCDataUpdateCoordinator(DataUpdateCoordinator):
         self,
         hass: HomeAssistant,
         mac_address: str | None = None,
+        options: Mapping[str, Any] | None = None,
+        fleet: FleetManager | None = None,
+        store: Store | None = None,
     ) -> None:
         """Initialize the coordinator."""
-        super().__init__(
-            hass,
-            _LOGGER,
-            name=DOMAIN,
-            update_interval=timedelta(seconds=UPDATE_INTERVAL),
-        )
+        # Push driven: data arrives through BLE notifications, there is no
+        # polling. While disconnected the reconnect supervisor takes over.
+        super().__init__(hass, _LOGGER, name=DOMAIN)
         self.mac_address = mac_address
+        self.fleet = fleet
         self.client: BleakClient | None = None
         self.decoder = LynxDecoder()
         self._device_name: str | None = None
+        self._key_listeners: dict[str, list[CALLBACK_TYPE]] = {}
+        # Keys to notify on the next listener update, None for all listeners
+        self._changed_keys: list[str] | None = None
+        self._decode_plan_scheduled = False
+        # Called with every decoded frame, at full rate
+        self._frame_listeners: list[Callable[[FrameRecord], None]] = []
 
-    async def _async_update_data(self) -> dict[str, Any]:
-        """Fetch data from EUC device."""
-        try:
-            # Ensure we're connected
-            if not self.client or not self.client.is_connected:
-                # Use a smaller timeout for connection attempts to avoid blocking
-                # the coordinator update cycle for too long when device is off
-                try:
-                    async with asyncio.timeout(30):
-                        await self._connect()
-                except (asyncio.TimeoutError, Exception) as err:
-                    _LOGGER.debug("Device not available (expected if off): %s", err)
-                    # When device is off, we want to clear data so entities show as unavailable
-                    self.decoder.clear_data()
-                    return {}
-
-            # Return the latest decoded data
-            data = self.decoder.get_data()
-            if data is None:
-                return {}
-            return data
+        # Data keys and firmware seen from this wheel, persisted in the store
+        self._store = store
+        self.capabilities: set[str] = set()
+        self.firmware: float | None = None
+        self._capability_listeners: list[CALLBACK_TYPE] = []
 
-        except Exception as err:
-            _LOGGER.debug("Update failed: %s", err)
-            self._handle_disconnect()
-            raise UpdateFailed(f"BLE connection failed: {err}") from err
+        # Publish rate limiting, the newest frame wins
+        options = options or {}
+        self._publish_interval_idle = 1 / options.get(
+            CONF_PUBLISH_RATE_IDLE, DEFAULT_PUBLISH_RATE_IDLE
+        )
+        self._publish_interval_riding = 1 / options.get(
+            CONF_PUBLISH_RATE_RIDING, DEFAULT_PUBLISH_RATE_RIDING
+        )
+        self._pending_data: Mapping[str, Any] | None = None
+        self._last_publish = 0.0
+        self._unsub_publish: CALLBACK_TYPE | None = None
+
+        # Reconnect supervisor
+        self._connect_lock = asyncio.Lock()
+        self._unsub_reconnect: CALLBACK_TYPE | None = None
+        self._reconnect_attempts = 0
+        self._reconnect_delay = float(RECONNECT_BACKOFF_MIN)
+        self._last_connect_attempt = 0.0
+        # Whether the last connection attempt failed, advertisements then
+        # wait out the backoff like the scheduled attempt
+        self._connect_failed = False
+        self._shutting_down = False
+        # GATT services are reused from the adapter cache across reconnects
+        # until they turn out stale
+        self._use_services_cache = True
+        self._notify_handle: int | None = None
+
+        # Values of the diagnostic sensors: link health counters updated
+        # every HEALTH_UPDATE_INTERVAL, and the time from starting a
+        # connection to the first decoded frame
+        self.diagnostics: dict[str, Any] = {"first_frame_latency": None}
+        self._connect_started = 0.0
+        self._awaiting_first_frame = False
+        self._notifications = 0
+        # Smoothed variation of frame inter-arrival times (RFC 3550)
+        self._frame_jitter = 0.0  # s
+        self._last_frame_time: float | None = None
+        self._last_frame_interval: float | None = None
+        self._health_time = time.monotonic()
+        self._health_notifications = 0
+        self._health_frames = 0
+        self._unsub_health: CALLBACK_TYPE | None = async_track_time_interval(
+            hass,
+            self._async_update_health,
+            timedelta(seconds=HEALTH_UPDATE_INTERVAL),
+        )
+
+        # Raw notification capture, written from the executor
+        self._capture: CaptureRecorder | None = None
+        self._unsub_capture_flush: CALLBACK_TYPE | None = None
+        if mac_address and options.get(CONF_CAPTURE):
+            self._capture = CaptureRecorder(
+                hass.config.path(
+                    CAPTURE_DIR, f"{mac_address.replace(':', '').lower()}.euccap"
+                ),
+                CAPTURE_MAX_BYTES,
+                CAPTURE_BACKUP_COUNT,
+            )
+            self._unsub_capture_flush = async_track_time_interval(
+                hass,
+                self._async_flush_capture,
+                timedelta(seconds=CAPTURE_FLUSH_INTERVAL),
+            )
+
+        self._unsub_advertisement: CALLBACK_TYPE | None = None
+        if mac_address:
+            # Reconnect as soon as the wheel advertises instead of waiting
+            # for the backoff to expire
+            self._unsub_advertisement = bluetooth.async_register_callback(
+                hass,
+                self._async_handle_advertisement,
+                bluetooth.BluetoothCallbackMatcher(
+                    address=mac_address, connectable=True
+                ),
+                bluetooth.BluetoothScanningMode.PASSIVE,
+            )
+
+    async def async_load_capabilities(self) -> None:
+        """Load the data keys and firmware seen in earlier sessions."""
+        if self._store is None:
+            return
+        if stored := await self._store.async_load():
+            self.capabilities = set(stored["capabilities"])
+            self.firmware = stored.get("firmware")
+
+    @callback
+    def async_add_capability_listener(
+        self, update_callback: CALLBACK_TYPE
+    ) -> CALLBACK_TYPE:
+        """Listen for new data keys or a firmware change."""
+        self._capability_listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Remove the capability listener."""
+            self._capability_listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def _async_check_capabilities(self, data: Mapping[str, Any]) -> None:
+        """Record data keys and firmware not seen before."""
+        firmware = data.get("version")
+        if firmware == self.firmware and data.keys() <= self.capabilities:
+            return
+
+        self.capabilities.update(data)
+        self.firmware = firmware
+        self._schedule_decode_plan()
+        if self._store is not None:
+            self._store.async_delay_save(
+                self._capabilities_to_store, CAPABILITIES_SAVE_DELAY
+            )
+        for update_callback in list(self._capability_listeners):
+            update_callback()
+
+    def _capabilities_to_store(self) -> dict[str, Any]:
+        """Return the capabilities to persist."""
+        return {"capabilities": sorted(self.capabilities), "firmware": self.firmware}
+
+    async def _async_update_data(self) -> Mapping[str, Any] | None:
+        """Return the data last published.
+
+        Nothing polls, data is pushed by BLE notifications and connecting is
+        left to the reconnect supervisor. This only runs when a refresh is
+        requested, like homeassistant.update_entity, and must not start a
+        connection outside the supervisor's backoff and the fleet's slots.
+        """
+        return self.data
 
     def _handle_disconnect(self) -> None:
         """Helper to handle disconnection state."""
+        self._cancel_pending_publish()
         if self.client:
             try:
                 # Fire and forget disconnect
@@ -75,6 +221,124 @@ class EUCDataUpdateCoordinator(DataUpdateCoordinator):
                 pass
             self.client = None
         self.decoder.clear_data()
+        # The gap until the next connection is not a frame interval
+        self._last_frame_time = None
+        self._last_frame_interval = None
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        """Give the BLE session slot back to the fleet."""
+        if self.fleet is not None:
+            self.fleet.release(self)
+
+    @property
+    def is_active(self) -> bool:
+        """Return True while the wheel is riding or charging."""
+        data = self.decoder.get_data()
+        if not data:
+            return False
+        return (data.get("speed") or 0) >= RIDING_SPEED or bool(data.get("charge_mode"))
+
+    async def async_yield_slot(self) -> None:
+        """Disconnect so another wheel can use the BLE session slot.
+
+        The slot is released right away, before anything is awaited.
+        """
+        _LOGGER.debug("Yielding BLE slot of idle wheel %s", self.mac_address)
+        self._handle_disconnect()
+        self.async_set_updated_data({})
+        self._schedule_reconnect()
+
+    async def async_start(self) -> None:
+        """Make the first connection attempt, then leave it to the supervisor."""
+        await self._async_reconnect()
+
+    async def _async_ensure_connected(self) -> None:
+        """Connect to the device unless a session is already live."""
+        async with self._connect_lock:
+            if self.client and self.client.is_connected:
+                return
+            if self.fleet is not None:
+                # Only queue for a BLE slot while the wheel is in range
+                if not bluetooth.async_address_present(
+                    self.hass, self.mac_address, connectable=True
+                ):
+                    raise UpdateFailed(f"{self.mac_address} is not in range")
+                await self.fleet.async_acquire(self)
+
+            self._last_connect_attempt = time.monotonic()
+            try:
+                # Bound the attempt so a wheel that is off does not hold the
+                # adapter for long
+                async with asyncio.timeout(CONNECT_TIMEOUT):
+                    await self._connect()
+            except BaseException:
+                self._connect_failed = True
+                self._release_slot()
+                raise
+            if self._shutting_down:
+                # Unloaded while connecting, nobody would close this session
+                self._handle_disconnect()
+                raise UpdateFailed(f"{self.mac_address} is shutting down")
+            self._connect_failed = False
+            self._reconnect_attempts = 0
+
+    @callback
+    def _schedule_reconnect(self) -> None:
+        """Schedule a reconnect attempt with exponential backoff."""
+        if self._unsub_reconnect is not None or self._shutting_down:
+            return
+        backoff = min(
+            RECONNECT_BACKOFF_MAX, RECONNECT_BACKOFF_MIN * 2**self._reconnect_attempts
+        )
+        self._reconnect_attempts += 1
+        # Jitter keeps several wheels from retrying in lockstep
+        delay = random.uniform(backoff / 2, backoff)
+        self._reconnect_delay = delay
+        _LOGGER.debug("Reconnecting to %s in %.1f s", self.mac_address, delay)
+        self._unsub_reconnect = async_call_later(
+            self.hass, delay, self._async_reconnect
+        )
+
+    @callback
+    def _async_handle_advertisement(
+        self,
+        service_info: bluetooth.BluetoothServiceInfoBleak,
+        change: bluetooth.BluetoothChange,
+    ) -> None:
+        """Reconnect right away when the wheel is seen advertising.
+
+        After a successful session or while the wheel was out of range, the
+        advertisement cuts the backoff short. A wheel that advertises but
+        fails to connect is retried no faster than the backoff allows.
+        """
+        wait = self._reconnect_delay if self._connect_failed else RECONNECT_BACKOFF_MIN
+        if (
+            self._shutting_down
+            or self._connect_lock.locked()
+            or (self.client and self.client.is_connected)
+            or time.monotonic() - self._last_connect_attempt < wait
+        ):
+            return
+        _LOGGER.debug("Advertisement from %s, reconnecting", self.mac_address)
+        self._cancel_reconnect()
+        self.hass.async_create_task(self._async_reconnect())
+
+    async def _async_reconnect(self, _now: Any = None) -> None:
+        """Try to reconnect, scheduling the next attempt on failure."""
+        self._unsub_reconnect = None
+        try:
+            await self._async_ensure_connected()
+        except (asyncio.TimeoutError, Exception) as err:
+            _LOGGER.debug("Reconnect to %s failed: %s", self.mac_address, err)
+            self._handle_disconnect()
+            self._schedule_reconnect()
+
+    def _cancel_reconnect(self) -> None:
+        """Stop the reconnect supervisor."""
+        if self._unsub_reconnect is not None:
+            self._unsub_reconnect()
+            self._unsub_reconnect = None
 
     async def _connect(self) -> None:
         """Connect to the EUC device."""
@@ -92,38 +356,274 @@ class EUCDataUpdateCoordinator(DataUpdateCoordinator):
             raise UpdateFailed(f"Could not find device with MAC address {self.mac_address}")
 
         self._device_name = device.name or device.address
-        
+        self._connect_started = time.monotonic()
+        self._awaiting_first_frame = False
+        self.decoder.reset()
+
+        use_cache = self._use_services_cache
         try:
             self.client = await establish_connection(
-                BleakClient,
+                BleakClientWithServiceCache,
                 device,
                 self._device_name,
                 disconnected_callback=self._on_disconnect,
+                use_services_cache=use_cache,
             )
         except Exception as err:
             raise UpdateFailed(f"Failed to connect to {self.mac_address}: {err}") from err
 
-        # Subscribe to notifications
-        await self.client.start_notify(
-            EUC_CHARACTERISTIC_UUID, self._notification_handler
-        )
+        # Subscribe to notifications, by handle when the cached services
+        # have already been resolved
+        char_specifier = self._notify_handle if use_cache else None
+        try:
+            await self.client.start_notify(
+                char_specifier or EUC_CHARACTERISTIC_UUID, self._notification_handler
+            )
+        except Exception as err:
+            if not use_cache:
+                raise
+            # Stale cache, the next attempt runs full service discovery
+            _LOGGER.debug(
+                "Cached GATT services of %s are stale: %s", self.mac_address, err
+            )
+            self._use_services_cache = False
+            self._notify_handle = None
+            await self.client.clear_cache()
+            raise UpdateFailed(f"Stale GATT services for {self.mac_address}") from err
+
+        if char_specifier is None:
+            char = self.client.services.get_characteristic(EUC_CHARACTERISTIC_UUID)
+            self._notify_handle = char.handle if char else None
+        self._use_services_cache = True
+        self._awaiting_first_frame = True
         _LOGGER.info("Connected to EUC device: %s", self._device_name)
 
     def _on_disconnect(self, client: BleakClient) -> None:
         """Handle disconnection."""
+        if client is not self.client:
+            # A session closed on purpose, already handled; the slot may
+            # belong to a newer session by now
+            return
         _LOGGER.info("Disconnected from %s", self.mac_address)
         self._handle_disconnect()
         # Notify coordinator that data is now empty
         self.async_set_updated_data({})
+        self._schedule_reconnect()
 
     def _notification_handler(self, sender, data: bytearray) -> None:
         """Handle BLE notifications."""
-        self.decoder.process_data(data)
-        # Trigger a state update when new data arrives
-        self.async_set_updated_data(self.decoder.get_data() or {})
+        if self._capture is not None:
+            self._capture.record(data)
+        self._notifications += 1
+        records = self.decoder.feed(data)
+        if not records:
+            # No new frame completed
+            return
+
+        # Jitter of the notifications delivering frames: every frame of one
+        # notification has its arrival time, so intervals between them are 0
+        arrival = records[0].timestamp
+        if self._last_frame_time is not None:
+            interval = arrival - self._last_frame_time
+            if self._last_frame_interval is not None:
+                variation = abs(interval - self._last_frame_interval)
+                self._frame_jitter += (variation - self._frame_jitter) / 16
+            self._last_frame_interval = interval
+        self._last_frame_time = arrival
+
+        if self._frame_listeners:
+            # Loggers get every frame, entities only the newest
+            for frame_callback in list(self._frame_listeners):
+                for record in records:
+                    frame_callback(record)
+
+        frame = records[-1]
+        if self._awaiting_first_frame:
+            self._awaiting_first_frame = False
+            latency = records[0].timestamp - self._connect_started
+            self.diagnostics["first_frame_latency"] = round(latency * 1000)
+            _LOGGER.debug(
+                "First frame from %s %.2f s after connecting", self.mac_address, latency
+            )
+            self._async_notify_key("first_frame_latency")
+
+        # Decoding runs at full rate, publishing only keeps the newest frame
+        self._pending_data = frame
+        bypass = self._bypass_rate_limit(frame)
+        if self._unsub_publish is not None:
+            if not bypass:
+                # The scheduled publish will pick up this frame
+                return
+            self._unsub_publish()
+            self._unsub_publish = None
+
+        riding = (frame.get("speed") or 0) >= RIDING_SPEED
+        interval = self._publish_interval_riding if riding else self._publish_interval_idle
+        delay = self._last_publish + interval - time.monotonic()
+        if bypass or delay <= 0:
+            self._async_publish_pending()
+        else:
+            self._unsub_publish = async_call_later(
+                self.hass, delay, self._async_publish_pending
+            )
+
+    @callback
+    def _async_update_health(self, _now: Any = None) -> None:
+        """Update the link health diagnostics."""
+        now = time.monotonic()
+        elapsed = now - self._health_time
+        health = self.decoder.get_stats()
+        frames = health["frames_decoded"] - self._health_frames
+        health["notification_rate"] = round(
+            (self._notifications - self._health_notifications) / elapsed, 1
+        )
+        # Without frames there is nothing to measure jitter on, in ms
+        health["frame_jitter"] = round(self._frame_jitter * 1000, 1) if frames else None
+        self._health_time = now
+        self._health_notifications = self._notifications
+        self._health_frames = health["frames_decoded"]
+
+        diagnostics = self.diagnostics
+        for key, value in health.items():
+            if diagnostics.get(key) != value:
+                diagnostics[key] = value
+                self._async_notify_key(key)
+
+    async def _async_flush_capture(self, _now: Any = None) -> None:
+        """Write the captured notifications to disk."""
+        try:
+            await self.hass.async_add_executor_job(self._capture.flush)
+        except OSError as err:
+            _LOGGER.warning("Error writing capture of %s: %s", self.mac_address, err)
+
+    def _bypass_rate_limit(self, frame: Mapping[str, Any]) -> bool:
+        """Return True if the frame must be published without waiting."""
+        published = self.data
+        if not published or not frame:
+            # Availability changes
+            return True
+        return any(frame.differs(published, key) for key in PUBLISH_BYPASS_KEYS)
+
+    @callback
+    def _async_publish_pending(self, _now: Any = None) -> None:
+        """Publish the newest pending frame."""
+        self._unsub_publish = None
+        if self._pending_data is None:
+            return
+        data, self._pending_data = self._pending_data, None
+        self._last_publish = time.monotonic()
+        self._async_publish(data)
+
+    def _cancel_pending_publish(self) -> None:
+        """Drop a scheduled publish and its pending frame."""
+        if self._unsub_publish is not None:
+            self._unsub_publish()
+            self._unsub_publish = None
+        self._pending_data = None
+
+    @callback
+    def async_add_key_listener(
+        self, key: str, update_callback: CALLBACK_TYPE
+    ) -> CALLBACK_TYPE:
+        """Listen for changes of a single data key."""
+        if key not in self._key_listeners:
+            self._schedule_decode_plan()
+        listeners = self._key_listeners.setdefault(key, [])
+        listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Remove the key listener."""
+            listeners.remove(update_callback)
+            if not listeners:
+                self._key_listeners.pop(key, None)
+                self._schedule_decode_plan()
+
+        return remove_listener
+
+    @callback
+    def async_add_frame_listener(
+        self, frame_callback: Callable[[FrameRecord], None]
+    ) -> CALLBACK_TYPE:
+        """Listen for every decoded frame, before rate limiting."""
+        self._frame_listeners.append(frame_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Remove the frame listener."""
+            self._frame_listeners.remove(frame_callback)
+
+        return remove_listener
+
+    @callback
+    def _schedule_decode_plan(self) -> None:
+        """Rebuild the decode plan once the current batch of changes is done."""
+        if not self._decode_plan_scheduled:
+            self._decode_plan_scheduled = True
+            self.hass.loop.call_soon(self._update_decode_plan)
+
+    @callback
+    def _update_decode_plan(self) -> None:
+        """Only decode the keys of enabled sensors and keys not seen yet."""
+        self._decode_plan_scheduled = False
+        # Sensors of disabled entities are never added, so the key listeners
+        # are exactly the keys enabled entities consume
+        keys = set(self._key_listeners)
+        keys.update(COORDINATOR_KEYS)
+        if self.fleet is not None:
+            keys.update(FLEET_INPUT_KEYS)
+        # Keep decoding keys never seen, their sensors are created on sight
+        keys.update(DECODER_KEYS - self.capabilities)
+        self.decoder.set_keys(keys)
+
+    @callback
+    def _async_publish(self, data: Mapping[str, Any]) -> None:
+        """Publish decoded data, notifying only listeners of changed keys."""
+        previous = self.data
+        if previous and data:
+            # Frame records compare raw integers, nothing is scaled here
+            self._changed_keys = [
+                key for key in self._key_listeners if data.differs(previous, key)
+            ]
+        # Going from or to no data changes availability, so that case
+        # falls through to a full listener update.
+        try:
+            self.async_set_updated_data(data)
+        finally:
+            self._changed_keys = None
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update listeners, only those of changed keys during a publish."""
+        if self.data:
+            self._async_check_capabilities(self.data)
+        if self.fleet is not None:
+            self.fleet.aggregates.update(self, self.data or {})
+
+        if self._changed_keys is None:
+            super().async_update_listeners()
+            return
+
+        for key in self._changed_keys:
+            self._async_notify_key(key)
+
+    @callback
+    def _async_notify_key(self, key: str) -> None:
+        """Call the listeners of a single key."""
+        for update_callback in list(self._key_listeners.get(key, ())):
+            update_callback()
 
     async def async_shutdown(self) -> None:
         """Shutdown the coordinator."""
+        self._shutting_down = True
+        self._cancel_reconnect()
+        if self._unsub_health is not None:
+            self._unsub_health()
+            self._unsub_health = None
+        if self._unsub_advertisement is not None:
+            self._unsub_advertisement()
+            self._unsub_advertisement = None
+        self._cancel_pending_publish()
         if self.client and self.client.is_connected:
             try:
                 await self.client.disconnect()
@@ -131,6 +631,17 @@ class EUCDataUpdateCoordinator(DataUpdateCoordinator):
                 _LOGGER.debug("Error disconnecting: %s", err)
             finally:
                 self.client = None
+        self._release_slot()
+        if self._capture is not None:
+            self._unsub_capture_flush()
+            self._unsub_capture_flush = None
+            try:
+                await self.hass.async_add_executor_job(self._capture.close)
+            except OSError as err:
+                _LOGGER.warning(
+                    "Error writing capture of %s: %s", self.mac_address, err
+                )
+            self._capture = None
 
     @property
     def device_name(self) -> str:
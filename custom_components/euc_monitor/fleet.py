@@ -0,0 +1,336 @@
+"""Fleet manager sharing BLE connection slots and totals between EUC wheels."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import logging
+import time
+from typing import Any, Callable, Protocol
+
+from .const import (
+    FLEET_IDLE_SESSION_TIME,
+    FLEET_PUBLISH_INTERVAL,
+    FLEET_ROTATE_INTERVAL,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class FleetWheel(Protocol):
+    """Interface the fleet manager needs from a wheel."""
+
+    mac_address: str
+
+    @property
+    def is_active(self) -> bool:
+        """Return True while the wheel is riding or charging."""
+
+    async def async_yield_slot(self) -> None:
+        """Close the BLE session so another wheel can use the slot.
+
+        The slot has to be released before the first await, while the
+        wheel is still known to be disconnected.
+        """
+
+
+class FleetManager:
+    """Limit concurrent BLE sessions across all configured wheels.
+
+    A wheel acquires a slot before connecting and releases it when the
+    session ends. When wheels are waiting and every slot is taken, idle
+    wheels that have held their slot for a while are asked to yield it,
+    longest session first, and queue up again behind the waiting wheels,
+    so idle wheels take turns. Riding or charging wheels are never asked
+    to yield.
+    """
+
+    def __init__(
+        self,
+        idle_session_time: float = FLEET_IDLE_SESSION_TIME,
+        rotate_interval: float = FLEET_ROTATE_INTERVAL,
+    ) -> None:
+        """Initialize the fleet manager."""
+        self._idle_session_time = idle_session_time
+        self._rotate_interval = rotate_interval
+        self._limits: dict[FleetWheel, int] = {}  # Registered wheels
+        self._sessions: dict[FleetWheel, float] = {}  # Wheel -> session start
+        self._waiters: deque[tuple[FleetWheel, asyncio.Future[None]]] = deque()
+        self._yielding: set[FleetWheel] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self._rotate_handle: asyncio.TimerHandle | None = None
+        self.aggregates = FleetAggregates()
+
+    @property
+    def max_sessions(self) -> int:
+        """Return the session limit, the lowest configured by any wheel."""
+        return min(self._limits.values(), default=0)
+
+    @property
+    def sessions(self) -> int:
+        """Return the number of slots in use."""
+        return len(self._sessions)
+
+    @property
+    def waiting(self) -> int:
+        """Return the number of wheels waiting for a slot."""
+        return len(self._waiters)
+
+    @property
+    def wheels(self) -> int:
+        """Return the number of registered wheels."""
+        return len(self._limits)
+
+    def register(self, wheel: FleetWheel, max_sessions: int) -> None:
+        """Add a wheel with the session limit configured for it."""
+        self._limits[wheel] = max_sessions
+        self._grant()
+
+    def unregister(self, wheel: FleetWheel) -> None:
+        """Remove a wheel, freeing its slot."""
+        self._limits.pop(wheel, None)
+        for waiter in [w for w in self._waiters if w[0] is wheel]:
+            self._waiters.remove(waiter)
+            waiter[1].cancel()
+        self.release(wheel)
+        self.aggregates.remove(wheel)
+
+    async def async_acquire(self, wheel: FleetWheel) -> None:
+        """Wait for a free BLE session slot."""
+        if wheel in self._sessions:
+            return
+        if not self._waiters and len(self._sessions) < self.max_sessions:
+            self._sessions[wheel] = time.monotonic()
+            return
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        waiter = (wheel, future)
+        self._waiters.append(waiter)
+        _LOGGER.debug("Waiting for a BLE slot, %s wheels queued", len(self._waiters))
+        self._schedule_rotation()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif future.done() and not future.cancelled():
+                # Granted just before the cancellation
+                self.release(wheel)
+            raise
+
+    def release(self, wheel: FleetWheel) -> None:
+        """Free the slot held by a wheel."""
+        self._yielding.discard(wheel)
+        if self._sessions.pop(wheel, None) is not None:
+            self._grant()
+
+    def shutdown(self) -> None:
+        """Stop rotating and drop all waiters."""
+        if self._rotate_handle is not None:
+            self._rotate_handle.cancel()
+            self._rotate_handle = None
+        while self._waiters:
+            self._waiters.popleft()[1].cancel()
+        self.aggregates.shutdown()
+
+    def _grant(self) -> None:
+        """Hand free slots to waiting wheels in queue order."""
+        while self._waiters and len(self._sessions) < self.max_sessions:
+            wheel, future = self._waiters.popleft()
+            if future.done():
+                continue
+            self._sessions[wheel] = time.monotonic()
+            future.set_result(None)
+
+    def _schedule_rotation(self) -> None:
+        """Check for idle wheels to rotate out while wheels are waiting."""
+        if self._rotate_handle is None:
+            self._rotate_handle = asyncio.get_running_loop().call_later(
+                self._rotate_interval, self._rotate
+            )
+
+    def _rotate(self) -> None:
+        """Ask idle wheels to yield their slots to waiting wheels."""
+        self._rotate_handle = None
+        self._grant()
+        if not self._waiters:
+            return
+
+        now = time.monotonic()
+        needed = len(self._waiters) - len(self._yielding)
+        candidates = sorted(
+            (
+                (started, wheel)
+                for wheel, started in self._sessions.items()
+                if wheel not in self._yielding
+                and now - started >= self._idle_session_time
+                and not wheel.is_active
+            ),
+            key=lambda item: item[0],
+        )
+        for _started, wheel in candidates[: max(needed, 0)]:
+            self._yielding.add(wheel)
+            # The wheel releases its slot itself; releasing it here once the
+            # task is done could free the slot of a session started since
+            task = asyncio.get_running_loop().create_task(wheel.async_yield_slot())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            task.add_done_callback(
+                lambda task, wheel=wheel: self._yield_done(wheel, task)
+            )
+
+        self._schedule_rotation()
+
+    def _yield_done(self, wheel: FleetWheel, task: asyncio.Task) -> None:
+        """Log a wheel that failed to yield, it may be asked again."""
+        self._yielding.discard(wheel)
+        if not task.cancelled() and (err := task.exception()) is not None:
+            _LOGGER.warning("Error yielding a BLE slot: %s", err)
+
+
+class _Extreme:
+    """Running minimum or maximum of one value per wheel.
+
+    Setting a value is O(1). Only when the wheel holding the extreme moves
+    away from it (or goes offline) is the extreme recomputed, on the next
+    read.
+    """
+
+    def __init__(self, func: Callable[..., Any]) -> None:
+        """Initialize with min or max."""
+        self._func = func
+        self._values: dict[Any, float] = {}
+        self._value: float | None = None
+        self._stale = False
+
+    def set(self, wheel: Any, value: float | None) -> None:
+        """Set the value of a wheel, None if it has none."""
+        old = self._values.get(wheel)
+        if value == old:
+            return
+        if value is None:
+            del self._values[wheel]
+        else:
+            self._values[wheel] = value
+
+        if value is not None and (
+            self._value is None or self._func(value, self._value) == value
+        ):
+            self._value = value
+        elif old is not None and old == self._value:
+            self._stale = True
+
+    @property
+    def value(self) -> float | None:
+        """Return the current extreme."""
+        if self._stale:
+            self._value = self._func(self._values.values(), default=None)
+            self._stale = False
+        return self._value
+
+
+class FleetAggregates:
+    """Fleet totals kept up to date from each wheel's published data.
+
+    Updates are O(1) per wheel update. Listeners are called on a throttled
+    schedule, at most once per publish interval and only for totals that
+    changed.
+    """
+
+    def __init__(self, publish_interval: float = FLEET_PUBLISH_INTERVAL) -> None:
+        """Initialize the aggregates."""
+        self._publish_interval = publish_interval
+        self._distance: dict[str, float] = {}  # Address -> odometer
+        self._total_distance = 0.0
+        self._online: set[Any] = set()
+        self._charging: set[Any] = set()
+        self._min_voltage = _Extreme(min)
+        self._max_cell_delta = _Extreme(max)
+        self._listeners: dict[str, list[Callable[[], None]]] = {}
+        self._publish_handle: asyncio.TimerHandle | None = None
+        self.data: dict[str, Any] = {}
+        # Callbacks adding entities, by the config entry of each sensor
+        # platform set up, and the entry that created the fleet sensors
+        self.platforms: dict[str, Callable[[list[Any]], None]] = {}
+        self.owner: str | None = None
+        self.entities: list[Any] = []
+
+    def update(self, wheel: Any, data: dict[str, Any]) -> None:
+        """Fold the latest data of a wheel into the totals."""
+        # The odometer of a wheel that went offline still counts, by
+        # address so a reloaded wheel replaces its own reading
+        distance = data.get("total_distance")
+        if distance is not None:
+            address = wheel.mac_address
+            self._total_distance += distance - self._distance.get(address, 0.0)
+            self._distance[address] = distance
+
+        if data:
+            self._online.add(wheel)
+        else:
+            self._online.discard(wheel)
+        if data.get("charge_mode"):
+            self._charging.add(wheel)
+        else:
+            self._charging.discard(wheel)
+
+        self._min_voltage.set(wheel, data.get("voltage"))
+        deltas = [
+            delta
+            for delta in (data.get("bms1_delta"), data.get("bms2_delta"))
+            if delta is not None
+        ]
+        self._max_cell_delta.set(wheel, max(deltas) if deltas else None)
+        self._schedule_publish()
+
+    def remove(self, wheel: Any) -> None:
+        """Drop a wheel from the totals.
+
+        Its last odometer reading stays in the total distance, the sensor
+        is total_increasing and must not drop when a wheel is unloaded.
+        """
+        self.update(wheel, {})
+
+    def shutdown(self) -> None:
+        """Stop the publish timer."""
+        if self._publish_handle is not None:
+            self._publish_handle.cancel()
+            self._publish_handle = None
+
+    def async_add_key_listener(
+        self, key: str, update_callback: Callable[[], None]
+    ) -> Callable[[], None]:
+        """Listen for changes of one fleet total."""
+        listeners = self._listeners.setdefault(key, [])
+        listeners.append(update_callback)
+
+        def remove_listener() -> None:
+            """Remove the key listener."""
+            listeners.remove(update_callback)
+
+        return remove_listener
+
+    def _schedule_publish(self) -> None:
+        """Publish the totals once the publish interval has passed."""
+        if self._publish_handle is None:
+            self._publish_handle = asyncio.get_running_loop().call_later(
+                self._publish_interval, self._publish
+            )
+
+    def _publish(self) -> None:
+        """Notify listeners of the totals that changed."""
+        self._publish_handle = None
+        data = {
+            "fleet_total_distance": round(self._total_distance, 3)
+            if self._distance
+            else None,
+            "fleet_wheels_online": len(self._online),
+            "fleet_wheels_charging": len(self._charging),
+            "fleet_min_voltage": self._min_voltage.value,
+            "fleet_max_cell_delta": self._max_cell_delta.value,
+        }
+        previous = self.data
+        self.data = data
+        for key, value in data.items():
+            if key not in previous or previous[key] != value:
+                for update_callback in list(self._listeners.get(key, ())):
+                    update_callback()
@@ -1,9 +1,16 @@
 """Protocol decoder for Leaperkim Lynx EUC."""
+from array import array
+from collections.abc import Mapping
+from operator import attrgetter
 import struct
 import logging
+import time
 
 _LOGGER = logging.getLogger(__name__)
 
+# Frame header sequence: 220, 90, 92
+FRAME_HEADER = b"\xdc\x5a\x5c"
+
 # CRC32 Table (from VeteranDecoder.mc)
 CRC32_TABLE = [
     0x00000000, 0x77073096, 0xee0e612c, 0x990951ba, 0x076dc419, 0x706af48f,
@@ -52,8 +59,17 @@ CRC32_TABLE = [
 ]
 
 
-def calculate_crc32(data):
-    """Calculate CRC32 for the given data."""
+# Inputs used to verify a CRC backend against the table implementation
+CRC32_CHECK_VECTORS = (
+    b"",
+    b"123456789",
+    bytes(range(256)),
+    b"\xdc\x5a\x5c\x2c" + bytes(40),
+)
+
+
+def calculate_crc32_table(data):
+    """Calculate CRC32 for the given data using the lookup table."""
     crc = 0xffffffff
     for byte in data:
         index = (crc & 0xff) ^ byte
@@ -61,218 +77,695 @@ def calculate_crc32(data):
     return crc ^ 0xffffffff
 
 
+def _crc32_backends():
+    """Yield (name, function) pairs of CRC32 backends in preference order."""
+    try:
+        import zlib
+    except ImportError:
+        pass
+    else:
+        yield "zlib", zlib.crc32
+    try:
+        import binascii
+    except ImportError:
+        pass
+    else:
+        yield "binascii", binascii.crc32
+
+
+def select_crc32_backend():
+    """Return the fastest CRC32 backend that matches the lookup table."""
+    for name, func in _crc32_backends():
+        if all(func(v) == calculate_crc32_table(v) for v in CRC32_CHECK_VECTORS):
+            return name, func
+        _LOGGER.warning("CRC32 backend %s does not match table, skipping", name)
+    return "table", calculate_crc32_table
+
+
+CRC32_BACKEND, calculate_crc32 = select_crc32_backend()
+
+
+# Type code for 32-bit values sent as two big endian 16-bit words, low word first
+WORD_SWAPPED = "W"
+
+# Fixed frame fields: (key, offset, struct type code, divisor or None)
+FRAME_FIELDS = (
+    ("voltage", 4, "h", 100.0),
+    ("speed", 6, "h", 10.0),  # Sign is direction, see ABSOLUTE_FIELDS
+    ("trip_distance", 8, WORD_SWAPPED, 1000.0),
+    ("total_distance", 12, WORD_SWAPPED, 1000.0),
+    ("current", 16, "h", 10.0),
+    ("temperature", 18, "H", 100.0),
+    ("auto_off", 20, "h", None),  # Sleep timer
+    ("charge_mode", 22, "h", None),
+    ("speed_alert", 24, "h", None),
+    ("speed_tiltback", 26, "h", None),
+    ("version", 28, "h", 1000.0),
+    ("ride_mode", 30, "h", None),  # Pedals mode
+    ("pitch_angle", 32, "h", 100.0),
+    ("hpwm", 34, "h", 100.0),
+)
+# Fields reported as absolute values
+ABSOLUTE_FIELDS = ("speed",)
+
+
+def _field_scaler(index, divisor, word_swapped, absolute):
+    """Return a function scaling one field of the raw struct values."""
+
+    def scale(values):
+        """Return the field in engineering units."""
+        value = values[index]
+        if word_swapped:
+            value = (value & 0xFFFF) << 16 | value >> 16
+        if absolute:
+            value = abs(value)
+        if divisor is not None:
+            value = value / divisor
+        return value
+
+    return scale
+
+
+class FrameLayout:
+    """Field table compiled into a single big endian struct."""
+
+    def __init__(self, fields, absolute=ABSOLUTE_FIELDS):
+        """Compile the field table."""
+        fmt = ">"
+        pos = 0
+        scaling = []  # (index, divisor, word swapped, absolute) per field
+        for i, (key, offset, code, divisor) in enumerate(fields):
+            if offset < pos:
+                raise ValueError(f"Field {key} overlaps the previous field")
+            if offset > pos:
+                fmt += f"{offset - pos}x"
+            word_swapped = code == WORD_SWAPPED
+            if word_swapped:
+                code = "I"
+            if divisor is not None:
+                divisor = float(divisor)
+            scaling.append((i, divisor, word_swapped, key in absolute))
+            fmt += code
+            pos = offset + struct.calcsize(">" + code)
+
+        self.struct = struct.Struct(fmt)
+        self.keys = tuple(field[0] for field in fields)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.scaling = tuple(scaling)
+        # One function per field, to scale single values when they are read
+        self.scalers = {
+            key: _field_scaler(*field) for key, field in zip(self.keys, self.scaling)
+        }
+        self._scaler_items = tuple(self.scalers.items())
+
+    def convert(self, values):
+        """Convert unpacked values to engineering units."""
+        return {key: scale(values) for key, scale in self._scaler_items}
+
+    def unpack(self, data):
+        """Return the raw struct values of all fields in table order.
+
+        Word swapped fields are returned as read and only fixed up when
+        scaled.
+        """
+        return self.struct.unpack_from(data)
+
+
+FRAME_LAYOUT = FrameLayout(FRAME_FIELDS)
+# Keys present in every decoded frame, whatever the firmware
+FRAME_KEYS = frozenset(FRAME_LAYOUT.keys)
+
+# SmartBMS
+BMS_NUM_CELLS = 36  # Lynx has 36 cells per BMS
+BMS_TEMPS = struct.Struct(">6h")
+BMS_CURRENTS = struct.Struct(">hh")
+# Cell packet structs by cell count, signed and unsigned
+BMS_CELLS_SIGNED = tuple(struct.Struct(f">{count}h") for count in range(16))
+BMS_CELLS_UNSIGNED = tuple(struct.Struct(f">{count}H") for count in range(16))
+CRC_STRUCT = struct.Struct(">I")
+BMS_CELL_KEYS = {
+    bms: tuple(f"bms{bms}_cell{i}" for i in range(BMS_NUM_CELLS)) for bms in (1, 2)
+}
+BMS_TEMP_KEYS = {bms: tuple(f"bms{bms}_temp{i}" for i in range(6)) for bms in (1, 2)}
+BMS_AGGREGATES = ("voltage", "min_cell", "max_cell", "avg_cell", "delta")
+# Cell packets 1-3 (5-7 for BMS 2) that make up a full cycle
+BMS_CYCLE_PACKETS = (1 << 1) | (1 << 2) | (1 << 3)
+
+
+_NO_VALUES = {}  # Shared empty mapping, never modified
+
+
+class FrameRecord(Mapping):
+    """Decoded frame as raw integers, scaled to engineering units when read.
+
+    Decoding a frame only stores the raw struct values and references to
+    the current SmartBMS values, so no floats or dicts are created per
+    frame. Reading a key scales that one value; differs() compares raw
+    integers. timestamp is the time.monotonic() receive time of the frame.
+    """
+
+    __slots__ = ("timestamp", "layout", "raw", "bms1", "bms2", "currents")
+
+    def __init__(
+        self,
+        timestamp,
+        layout,
+        raw,
+        bms1=_NO_VALUES,
+        bms2=_NO_VALUES,
+        currents=_NO_VALUES,
+    ):
+        """Initialize the record."""
+        self.timestamp = timestamp
+        self.layout = layout
+        self.raw = raw  # Struct values in layout order
+        self.bms1 = bms1  # SmartBMS values of the last full cycle
+        self.bms2 = bms2
+        self.currents = currents
+
+    def __getitem__(self, key):
+        """Return one value in engineering units."""
+        scale = self.layout.scalers.get(key)
+        if scale is not None:
+            return scale(self.raw)
+        for values in (self.bms1, self.bms2, self.currents):
+            if key in values:
+                return values[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        """Iterate over the keys, frame fields first."""
+        yield from self.layout.keys
+        yield from self.bms1
+        yield from self.bms2
+        yield from self.currents
+
+    def __len__(self):
+        """Return the number of keys."""
+        return len(self.raw) + len(self.bms1) + len(self.bms2) + len(self.currents)
+
+    def __eq__(self, other):
+        """Compare raw values when both sides are records."""
+        if isinstance(other, FrameRecord) and other.layout is self.layout:
+            return (
+                self.raw == other.raw
+                and self.bms1 == other.bms1
+                and self.bms2 == other.bms2
+                and self.currents == other.currents
+            )
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def differs(self, other, key):
+        """Return True if key has a different value in the other record."""
+        index = self.layout.index.get(key)
+        if index is not None and other.layout is self.layout:
+            return self.raw[index] != other.raw[index]
+        owner = _VALUE_OWNERS.get(key)
+        if owner is None:
+            # Frame field of another layout
+            return self.get(key) != other.get(key)
+        values = owner(self)
+        other_values = owner(other)
+        if values is other_values:
+            # Unchanged SmartBMS readings are shared between records
+            return False
+        return values.get(key) != other_values.get(key)
+
+    def as_dict(self):
+        """Return all values as a dict in engineering units."""
+        result = self.layout.convert(self.raw)
+        result.update(self.bms1)
+        result.update(self.bms2)
+        result.update(self.currents)
+        return result
+
+
+class BMSSnapshot:
+    """SmartBMS readings of one pack from a single complete packet cycle.
+
+    A snapshot is not changed once published, every cycle gets a new one,
+    so records keep the readings of the cycle they were decoded in.
+    """
+
+    __slots__ = ("bmsnum", "seq", "timestamp", "cells", "temps", "values")
+
+    def __init__(self, bmsnum, seq, timestamp, cells, temps, values):
+        """Initialize the snapshot."""
+        self.bmsnum = bmsnum
+        self.seq = seq  # Cycle sequence number
+        self.timestamp = timestamp  # time.monotonic() of the last packet
+        self.cells = cells  # Raw millivolts
+        self.temps = temps
+        self.values = values  # Published keys and values
+
+
+# Every key the decoder can produce
+DECODER_KEYS = FRAME_KEYS.union(
+    *BMS_CELL_KEYS.values(),
+    *BMS_TEMP_KEYS.values(),
+    [
+        f"bms{bms}_{name}"
+        for bms in (1, 2)
+        for name in (*BMS_AGGREGATES, "cells", "current")
+    ],
+)
+
+# Record attribute holding each SmartBMS key
+_VALUE_OWNERS = {
+    f"bms{bms}_current": attrgetter("currents") for bms in (1, 2)
+}
+for _bms in (1, 2):
+    for _key in (
+        *BMS_CELL_KEYS[_bms],
+        *BMS_TEMP_KEYS[_bms],
+        *(f"bms{_bms}_{name}" for name in (*BMS_AGGREGATES, "cells")),
+    ):
+        _VALUE_OWNERS[_key] = attrgetter(f"bms{_bms}")
+
+
+class BMSPlan:
+    """Values of one BMS to compute at the end of a packet cycle."""
+
+    def __init__(self, bmsnum, keys):
+        """Build the plan for the wanted keys."""
+        self.cell_keys = [
+            (i, key) for i, key in enumerate(BMS_CELL_KEYS[bmsnum]) if key in keys
+        ]
+        # With every cell wanted, keys and voltages can simply be zipped
+        self.all_cell_keys = (
+            BMS_CELL_KEYS[bmsnum] if len(self.cell_keys) == BMS_NUM_CELLS else None
+        )
+        self.temp_keys = [
+            (i, key) for i, key in enumerate(BMS_TEMP_KEYS[bmsnum]) if key in keys
+        ]
+        self.aggregates = {
+            name: key
+            for name in BMS_AGGREGATES
+            if (key := f"bms{bmsnum}_{name}") in keys
+        }
+        packed_key = f"bms{bmsnum}_cells"
+        self.packed_key = packed_key if packed_key in keys else None
+
+        # Which packet contents need decoding at all
+        self.cells = bool(self.cell_keys or self.aggregates or self.packed_key)
+        self.temps = bool(self.temp_keys)
+
+    def covers(self, other):
+        """Return True if this plan decodes everything the other one needs."""
+        return (self.cells or not other.cells) and (self.temps or not other.temps)
+
+    def values(self, cells, temps):
+        """Return published cell voltages, aggregates and temperatures."""
+        if self.all_cell_keys:
+            values = dict(zip(self.all_cell_keys, [c / 1000.0 for c in cells]))
+        else:
+            values = {key: cells[i] / 1000.0 for i, key in self.cell_keys}
+        for i, key in self.temp_keys:
+            values[key] = temps[i]
+        if self.packed_key:
+            values[self.packed_key] = tuple(cells)  # Raw millivolts
+
+        aggregates = self.aggregates
+        if aggregates:
+            valid_cells = [c for c in cells if c > 0]
+            if valid_cells:
+                total = sum(valid_cells) / 1000.0
+                min_cell = min(valid_cells) / 1000.0
+                max_cell = max(valid_cells) / 1000.0
+                for name, value in (
+                    ("voltage", total),
+                    ("min_cell", min_cell),
+                    ("max_cell", max_cell),
+                    ("avg_cell", total / len(valid_cells)),
+                    ("delta", max_cell - min_cell),
+                ):
+                    if name in aggregates:
+                        values[aggregates[name]] = value
+
+        return values
+
+
+class DecodePlan:
+    """Fields decode_frame computes, specialized for a set of wanted keys.
+
+    Fields nobody consumes are left out of the frame struct, and SmartBMS
+    packets are only unpacked as far as the wanted cell voltages,
+    temperatures and aggregates need. The firmware version is always
+    decoded, the BMS logic depends on it.
+    """
+
+    def __init__(self, keys=None):
+        """Build the plan, for all keys if keys is None."""
+        if keys is None:
+            keys = DECODER_KEYS
+        else:
+            keys = DECODER_KEYS.intersection(keys) | {"version"}
+        fields = tuple(field for field in FRAME_FIELDS if field[0] in keys)
+        self.keys = keys
+        self.layout = FRAME_LAYOUT if fields == FRAME_FIELDS else FrameLayout(fields)
+        self.version_index = self.layout.index["version"]
+        self.bms = {bms: BMSPlan(bms, keys) for bms in (1, 2)}
+        self.bms1_current = "bms1_current" in keys
+        self.bms2_current = "bms2_current" in keys
+
+
+FULL_DECODE_PLAN = DecodePlan()
+
+
 class LynxDecoder:
-    """Decoder for Leaperkim Lynx protocol."""
+    """Decoder for Leaperkim Lynx protocol.
+
+    feed() returns a FrameRecord for every frame a chunk of received
+    bytes completes; last_data is the newest of them. get_stats() returns
+    counters of the bytes and frames seen, for judging the link quality.
+
+    Once the wheel settles, decoding a frame allocates nothing that
+    outlives it: frames are read through a memoryview of the receive
+    buffer, and SmartBMS packets are compared as raw struct values before
+    anything is converted.
+    """
+
+    __slots__ = (
+        "buffer",
+        "needed",
+        "bms1_cells",
+        "bms2_cells",
+        "bms1_temps",
+        "bms2_temps",
+        "bms1_current",
+        "bms2_current",
+        "_bms_currents",
+        "_bms_currents_raw",
+        "last_data",
+        "bms_snapshots",
+        "_bms_received",
+        "_bms_changed",
+        "_cell_packets",
+        "_temps_raw",
+        "plan",
+        "bytes_received",
+        "frames_decoded",
+        "crc_errors",
+        "short_frames",
+        "header_resyncs",
+        "bytes_discarded",
+        "_synced_discarded",
+    )
 
     def __init__(self):
         """Initialize the decoder."""
-        self.frame = bytearray()
-        self.state = "unknown"
-        self.len = 0
-        self.old1 = 0
-        self.old2 = 0
-        # SmartBMS data storage
-        self.bms1_cells = [0.0] * 42  # Support up to 42 cells
-        self.bms2_cells = [0.0] * 42
+        self.buffer = bytearray()
+        self.needed = 0  # Buffer size required to complete the pending frame
+        # SmartBMS data storage, cells as raw millivolts
+        self.bms1_cells = array("i", [0]) * 42  # Support up to 42 cells
+        self.bms2_cells = array("i", [0]) * 42
         self.bms1_temps = [0.0] * 6
         self.bms2_temps = [0.0] * 6
         self.bms1_current = 0.0
         self.bms2_current = 0.0
+        self._bms_currents = _NO_VALUES  # Published currents
+        self._bms_currents_raw = None
         self.last_data = None
+        # SmartBMS cycle assembly: cells and temps above are the working
+        # buffers, bms_snapshots holds the last complete cycle per pack.
+        self.bms_snapshots = {1: None, 2: None}
+        self._bms_received = {1: 0, 2: 0}  # Bitmask of cell packets this cycle
+        self._bms_changed = {1: True, 2: True}
+        # Raw struct values of the last cell packets 1-3 and temperatures
+        self._cell_packets = {1: [None] * 4, 2: [None] * 4}
+        self._temps_raw = {1: None, 2: None}
+        self.plan = FULL_DECODE_PLAN
+        # Link health counters
+        self.bytes_received = 0
+        self.frames_decoded = 0
+        self.crc_errors = 0  # Frames dropped for a CRC mismatch
+        self.short_frames = 0  # Frames dropped for a length of 38 or less
+        self.header_resyncs = 0  # Times bytes were skipped to find a header
+        self.bytes_discarded = 0  # Bytes skipped looking for a header
+        self._synced_discarded = 0  # bytes_discarded at the last header found
+        self._update_currents()
+
+    def feed(self, data, timestamp=None):
+        """Add received bytes and return the records of the frames completed.
+
+        timestamp is the receive time of the bytes, time.monotonic() when
+        not given. Returns an empty tuple when no frame was completed.
+        """
+        buf = self.buffer
+        buf += data
+        self.bytes_received += len(data)
+        end = len(buf)
+        if end < self.needed:
+            # Still collecting the pending frame
+            return ()
+
+        records = None
+        pos = 0
+        needed = 0
+        # Frames are passed as views into the buffer instead of copies; the
+        # view is released before the buffer is trimmed
+        view = memoryview(buf)
+        while True:
+            start = buf.find(FRAME_HEADER, pos)
+            if start < 0:
+                # Keep a possible partial header for the next chunk
+                if end - 2 > pos:
+                    self.bytes_discarded += end - 2 - pos
+                    pos = end - 2
+                break
+            if start > pos:
+                self.bytes_discarded += start - pos
+            if self.bytes_discarded != self._synced_discarded:
+                # Bytes were skipped since the last header, maybe in an
+                # earlier chunk ending in part of this header
+                self.header_resyncs += 1
+                self._synced_discarded = self.bytes_discarded
+
+            # Length byte: frame size excluding the 4 CRC bytes
+            if start + 4 > end:
+                pos = start
+                needed = 4
+                break
+            frame_end = start + buf[start + 3] + 4
+            if frame_end > end:
+                pos = start
+                needed = frame_end - start
+                break
+
+            if timestamp is None:
+                timestamp = time.monotonic()
+            record = self.process_frame(view[start:frame_end], timestamp)
+            if record is not None:
+                if records is None:
+                    records = []
+                records.append(record)
+            pos = frame_end
+
+        view.release()
+        del buf[:pos]
+        self.needed = needed
+        return records or ()
 
     def process_data(self, data):
-        """Process incoming BLE data."""
-        for byte in data:
-            self.check_char(byte)
-
-    def check_char(self, c):
-        """Process a single byte."""
-        if self.state == "collecting":
-            self.frame.append(c)
-            size = len(self.frame)
-
-            if size == self.len + 4:
-                self.state = "done"
-                # Process frame
-                if self.len > 38:
-                    # Check CRC
-                    payload = self.frame[:-4]  # Exclude CRC
-                    provided_crc = struct.unpack(">I", self.frame[-4:])[0]
-                    calc_crc = calculate_crc32(payload)
-
-                    if calc_crc == provided_crc:
-                        self.decode_frame(self.frame)
-                    else:
-                        _LOGGER.debug(
-                            "CRC Mismatch: Calc %08x vs Prov %08x", calc_crc, provided_crc
-                        )
-
-                self.reset()
-
-        elif self.state == "lensearch":
-            self.frame.append(c)
-            self.len = c & 0xff
-            self.state = "collecting"
-            self.old2 = self.old1
-            self.old1 = c
-
-        else:  # unknown
-            # Header sequence: 220, 90, 92 (0xDC, 0x5A, 0x5C)
-            if c == 92 and self.old1 == 90 and self.old2 == 220:
-                self.frame = bytearray([220, 90, 92])
-                self.state = "lensearch"
-            elif c == 90 and self.old1 == 220:
-                self.old2 = self.old1
-            else:
-                self.old2 = 0
-            self.old1 = c
+        """Process incoming BLE data, keeping only the newest frame."""
+        self.feed(data)
+
+    def process_frame(self, frame, timestamp=None):
+        """Validate and decode a complete frame including its CRC.
+
+        Returns the decoded record, None if the frame was dropped.
+        """
+        if frame[3] > 38:
+            # Check CRC
+            payload = frame[:-4]  # Exclude CRC
+            provided_crc = CRC_STRUCT.unpack_from(frame, len(frame) - 4)[0]
+            calc_crc = calculate_crc32(payload)
+
+            if calc_crc == provided_crc:
+                self.frames_decoded += 1
+                return self.decode_frame(frame, timestamp)
+            self.crc_errors += 1
+            _LOGGER.debug(
+                "CRC Mismatch: Calc %08x vs Prov %08x", calc_crc, provided_crc
+            )
+        else:
+            self.short_frames += 1
+        return None
+
+    def set_keys(self, keys=None):
+        """Only decode the given keys from now on, all keys if None."""
+        plan = DecodePlan(keys)
+        if plan.keys == self.plan.keys:
+            return
+        previous = self.plan
+        self.plan = plan
+        self._update_currents()
+
+        for bmsnum, snapshot in self.bms_snapshots.items():
+            bms_plan = plan.bms[bmsnum]
+            self._bms_changed[bmsnum] = True
+            if not previous.bms[bmsnum].covers(bms_plan):
+                # Readings the old plan skipped are stale, wait for a new cycle
+                self.bms_snapshots[bmsnum] = None
+                self._bms_received[bmsnum] = 0
+            elif snapshot is not None:
+                self.bms_snapshots[bmsnum] = BMSSnapshot(
+                    bmsnum,
+                    snapshot.seq,
+                    snapshot.timestamp,
+                    snapshot.cells,
+                    snapshot.temps,
+                    bms_plan.values(snapshot.cells, snapshot.temps),
+                )
 
     def reset(self):
         """Reset decoder state."""
-        self.old1 = 0
-        self.old2 = 0
-        self.state = "unknown"
-        self.frame = bytearray()
-
-    def decode_frame(self, data):
-        """Decode a complete frame and update last_data."""
-        result = {}
-
-        # Voltage: offset 4, int16 big endian, / 100.0
-        result["voltage"] = struct.unpack(">h", data[4:6])[0] / 100.0
-
-        # Speed: offset 6, int16 big endian, abs(), / 10.0
-        result["speed"] = abs(struct.unpack(">h", data[6:8])[0]) / 10.0
-
-        # Trip Distance: offset 8, 4 bytes mixed endian
-        trip_dist_raw = (data[10] << 24) | (data[11] << 16) | (data[8] << 8) | (data[9])
-        result["trip_distance"] = trip_dist_raw / 1000.0
-
-        # Total Distance: offset 12, same weird format
-        total_dist_raw = (data[14] << 24) | (data[15] << 16) | (data[12] << 8) | (data[13])
-        result["total_distance"] = total_dist_raw / 1000.0
-
-        # Current: offset 16, int16 big endian, / 10.0
-        result["current"] = struct.unpack(">h", data[16:18])[0] / 10.0
-
-        # Temperature: offset 18, 2 bytes
-        result["temperature"] = ((data[18] << 8) | data[19]) / 100.0
-
-        # Auto Off (Sleep Timer): offset 20, int16 big endian
-        result["auto_off"] = struct.unpack(">h", data[20:22])[0]
-
-        # Charge Mode: offset 22, int16 big endian
-        result["charge_mode"] = struct.unpack(">h", data[22:24])[0]
-
-        # Speed Alert: offset 24, int16 big endian
-        result["speed_alert"] = struct.unpack(">h", data[24:26])[0]
-
-        # Speed Tiltback: offset 26, int16 big endian
-        result["speed_tiltback"] = struct.unpack(">h", data[26:28])[0]
-
-        # Version: offset 28, int16 big endian, / 1000.0
-        ver_raw = 0
-        if len(data) >= 30:
-            ver_raw = struct.unpack(">h", data[28:30])[0]
-            result["version"] = ver_raw / 1000.0
+        del self.buffer[:]
+        self.needed = 0
+
+    def decode_frame(self, data, timestamp=None):
+        """Decode a complete frame, update last_data and return its record."""
+        # Frames reaching here are at least 43 bytes, so the whole fixed
+        # block (offset 4-35) is always present.
+        if timestamp is None:
+            timestamp = time.monotonic()
+        plan = self.plan
+        raw = plan.layout.unpack(data)
+        ver_raw = raw[plan.version_index]
 
         # Determine mVer for BMS logic
         mVer = ver_raw // 1000 if ver_raw > 0 else 0
 
-        # Ride Mode (Pedals Mode): offset 30, int16 big endian
-        if len(data) >= 32:
-            result["ride_mode"] = struct.unpack(">h", data[30:32])[0]
-
-        # Pitch Angle: offset 32, int16 big endian (signed), / 100.0
-        if len(data) >= 34:
-            result["pitch_angle"] = struct.unpack(">h", data[32:34])[0] / 100.0
-
-        # HPWM: offset 34, int16 big endian, / 100.0
-        if len(data) >= 36:
-            result["hpwm"] = struct.unpack(">h", data[34:36])[0] / 100.0
-
         # SmartBMS parsing (for Lynx mVer >= 5)
         if mVer >= 5 and len(data) > 46:
             pnum = data[46]
             bmsnum = 1 if pnum < 4 else 2
             cells = self.bms1_cells if bmsnum == 1 else self.bms2_cells
             temps = self.bms1_temps if bmsnum == 1 else self.bms2_temps
+            bms_plan = plan.bms[bmsnum]
 
             if pnum == 0 or pnum == 4:
                 # BMS current data
                 if len(data) > 72:
-                    self.bms1_current = struct.unpack(">h", data[69:71])[0] / 100.0
-                    self.bms2_current = struct.unpack(">h", data[71:73])[0] / 100.0
+                    currents = BMS_CURRENTS.unpack_from(data, 69)
+                    if currents != self._bms_currents_raw:
+                        self._bms_currents_raw = currents
+                        self.bms1_current = currents[0] / 100.0
+                        self.bms2_current = currents[1] / 100.0
+                        self._update_currents()
             elif pnum == 1 or pnum == 5:
-                # Cells 0-14
-                for i in range(15):
-                    if 53 + i * 2 + 1 < len(data):
-                        cell = struct.unpack(">h", data[53 + i * 2:55 + i * 2])[0]
-                        cells[i] = cell / 1000.0
+                # Cells 0-14, sent signed. A packet too short to hold a
+                # cell is not counted as received.
+                count = min(15, (len(data) - 53) // 2)
+                if count > 0:
+                    if bms_plan.cells:
+                        values = BMS_CELLS_SIGNED[count].unpack_from(data, 53)
+                        self._update_cells(bmsnum, cells, 1, 0, values)
+                    self._bms_received[bmsnum] |= 1 << 1
             elif pnum == 2 or pnum == 6:
                 # Cells 15-29
-                for i in range(15):
-                    if 53 + i * 2 + 1 < len(data):
-                        cell = struct.unpack(">H", data[53 + i * 2:55 + i * 2])[0]
-                        cells[i + 15] = cell / 1000.0
-            elif pnum == 3 or pnum == 7:
-                # Cells 30-41 and temperatures
-                for i in range(12):
-                    offset = 59 + i * 2
-                    if offset + 1 < len(data):
-                        cell = struct.unpack(">H", data[offset:offset + 2])[0]
-                        cells[i + 30] = cell / 1000.0
-
-                if len(data) > 57:
-                    temps[0] = struct.unpack(">h", data[47:49])[0] / 100.0
-                    temps[1] = struct.unpack(">h", data[49:51])[0] / 100.0
-                    temps[2] = struct.unpack(">h", data[51:53])[0] / 100.0
-                    temps[3] = struct.unpack(">h", data[53:55])[0] / 100.0
-                    temps[4] = struct.unpack(">h", data[55:57])[0] / 100.0
-                    temps[5] = struct.unpack(">h", data[57:59])[0] / 100.0
-
-        # Calculate BMS aggregated values
+                count = min(15, (len(data) - 53) // 2)
+                if count > 0:
+                    if bms_plan.cells:
+                        values = BMS_CELLS_UNSIGNED[count].unpack_from(data, 53)
+                        self._update_cells(bmsnum, cells, 2, 15, values)
+                    self._bms_received[bmsnum] |= 1 << 2
+            elif (pnum == 3 or pnum == 7) and len(data) > 58:
+                # Cells 30-41 and temperatures, not counted without them
+                count = min(12, (len(data) - 59) // 2)
+                if count > 0 and bms_plan.cells:
+                    values = BMS_CELLS_UNSIGNED[count].unpack_from(data, 59)
+                    self._update_cells(bmsnum, cells, 3, 30, values)
+
+                if bms_plan.temps:
+                    values = BMS_TEMPS.unpack_from(data, 47)
+                    if values != self._temps_raw[bmsnum]:
+                        self._temps_raw[bmsnum] = values
+                        temps[:] = [t / 100.0 for t in values]
+                        self._bms_changed[bmsnum] = True
+
+                # Last packet of the cycle, publish only if none were missed
+                self._bms_received[bmsnum] |= 1 << 3
+                if self._bms_received[bmsnum] == BMS_CYCLE_PACKETS:
+                    self._publish_bms(bmsnum, timestamp)
+                self._bms_received[bmsnum] = 0
+
         if mVer >= 5:
-            num_cells = 36  # Lynx has 36 cells per BMS
-
-            # BMS 1
-            valid_cells_1 = [c for c in self.bms1_cells[:num_cells] if c > 0.0]
-            if valid_cells_1:
-                result["bms1_voltage"] = sum(valid_cells_1)
-                result["bms1_min_cell"] = min(valid_cells_1)
-                result["bms1_max_cell"] = max(valid_cells_1)
-                result["bms1_avg_cell"] = sum(valid_cells_1) / len(valid_cells_1)
-                result["bms1_delta"] = result["bms1_max_cell"] - result["bms1_min_cell"]
-
-            # BMS 2
-            valid_cells_2 = [c for c in self.bms2_cells[:num_cells] if c > 0.0]
-            if valid_cells_2:
-                result["bms2_voltage"] = sum(valid_cells_2)
-                result["bms2_min_cell"] = min(valid_cells_2)
-                result["bms2_max_cell"] = max(valid_cells_2)
-                result["bms2_avg_cell"] = sum(valid_cells_2) / len(valid_cells_2)
-                result["bms2_delta"] = result["bms2_max_cell"] - result["bms2_min_cell"]
-
-            # BMS currents
-            result["bms1_current"] = self.bms1_current
-            result["bms2_current"] = self.bms2_current
-
-            # BMS temperatures
-            for i in range(6):
-                result[f"bms1_temp{i}"] = self.bms1_temps[i]
-                result[f"bms2_temp{i}"] = self.bms2_temps[i]
-
-            # Individual cells
-            for i in range(num_cells):
-                result[f"bms1_cell{i}"] = self.bms1_cells[i]
-                result[f"bms2_cell{i}"] = self.bms2_cells[i]
-
-        self.last_data = result
+            # Cell voltages, aggregates and temperatures of the last full
+            # cycle, and the BMS currents
+            snapshots = self.bms_snapshots
+            bms1 = snapshots[1].values if snapshots[1] is not None else _NO_VALUES
+            bms2 = snapshots[2].values if snapshots[2] is not None else _NO_VALUES
+            currents = self._bms_currents
+        else:
+            bms1 = bms2 = currents = _NO_VALUES
+
+        record = FrameRecord(timestamp, plan.layout, raw, bms1, bms2, currents)
+        self.last_data = record
+        return record
+
+    def _update_currents(self):
+        """Rebuild the published BMS currents."""
+        currents = {}
+        if self.plan.bms1_current:
+            currents["bms1_current"] = self.bms1_current
+        if self.plan.bms2_current:
+            currents["bms2_current"] = self.bms2_current
+        self._bms_currents = currents
+
+    def _update_cells(self, bmsnum, cells, packet, start, values):
+        """Store raw cell millivolts, flagging the pack as changed."""
+        last = self._cell_packets[bmsnum]
+        if values != last[packet]:
+            last[packet] = values
+            end = start + len(values)
+            cells[start:end] = array("i", values)
+            self._bms_changed[bmsnum] = True
+
+    def _publish_bms(self, bmsnum, timestamp):
+        """Publish a snapshot of one BMS at the end of a packet cycle."""
+        previous = self.bms_snapshots[bmsnum]
+        if previous is not None and not self._bms_changed[bmsnum]:
+            # Same readings as the last cycle, share them with the new one
+            self.bms_snapshots[bmsnum] = BMSSnapshot(
+                bmsnum,
+                previous.seq + 1,
+                timestamp,
+                previous.cells,
+                previous.temps,
+                previous.values,
+            )
+            return
+
+        cells = self.bms1_cells if bmsnum == 1 else self.bms2_cells
+        temps = self.bms1_temps if bmsnum == 1 else self.bms2_temps
+        cells = cells[:BMS_NUM_CELLS]
+        temps = tuple(temps)
+        values = self.plan.bms[bmsnum].values(cells, temps)
+        self._bms_changed[bmsnum] = False
+
+        seq = previous.seq + 1 if previous is not None else 0
+        self.bms_snapshots[bmsnum] = BMSSnapshot(
+            bmsnum, seq, timestamp, cells, temps, values
+        )
 
     def get_data(self):
         """Get the last decoded data."""
         return self.last_data
 
+    def get_stats(self):
+        """Get the link health counters."""
+        return {
+            "bytes_received": self.bytes_received,
+            "frames_decoded": self.frames_decoded,
+            "crc_errors": self.crc_errors,
+            "short_frames": self.short_frames,
+            "header_resyncs": self.header_resyncs,
+            "bytes_discarded": self.bytes_discarded,
+        }
+
     def clear_data(self):
         """Clear the last data."""
         self.last_data = None
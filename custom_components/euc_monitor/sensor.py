@@ -1,15 +1,36 @@
 """Sensor platform for EUC Monitor integration."""
 from __future__ import annotations
 
-from homeassistant.components.sensor import SensorEntity
+import time
+from typing import Any
+
+from homeassistant.components.sensor import RestoreSensor, SensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN, MANUFACTURER, MODEL, SENSOR_TYPES
+from .const import (
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_MIN_INTERVAL,
+    DEADBAND_OPTIONS,
+    DEFAULT_HEARTBEAT_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DIAGNOSTIC_SENSOR_TYPES,
+    DOMAIN,
+    FLEET_DATA_KEY,
+    FLEET_DEVICE_ID,
+    FLEET_SENSOR_TYPES,
+    MANUFACTURER,
+    MODEL,
+    SENSOR_TYPES,
+)
 from .coordinator import EUCDataUpdateCoordinator
+from .fleet import FleetAggregates, FleetManager
+from .lynx_protocol import FRAME_KEYS
 
 
 async def async_setup_entry(
@@ -20,14 +41,114 @@ async def async_setup_entry(
     """Set up EUC Monitor sensors from a config entry."""
     coordinator: EUCDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
 
-    entities = []
-    for sensor_key, sensor_config in SENSOR_TYPES.items():
-        entities.append(EUCSensor(coordinator, entry, sensor_key, sensor_config))
+    # Deadband overrides from the options flow
+    deadbands = {}
+    for option, sensor_keys in DEADBAND_OPTIONS.items():
+        if option in entry.options:
+            for sensor_key in sensor_keys:
+                deadbands[sensor_key] = entry.options[option]
+
+    # Sensors are created for keys every frame has and keys seen from this
+    # wheel before; the rest (like SmartBMS on older firmware) only once
+    # they first show up in the data
+    added: set[str] = set()
+
+    def new_sensors(keys) -> list[SensorEntity]:
+        """Create sensors for keys that do not have one yet."""
+        sensors: list[SensorEntity] = []
+        for sensor_key, sensor_config in SENSOR_TYPES.items():
+            if sensor_key in added or sensor_key not in keys:
+                continue
+            if sensor_config.get("packed"):
+                sensors.append(
+                    EUCCellsSensor(coordinator, entry, sensor_key, sensor_config)
+                )
+                added.add(sensor_key)
+                continue
+            if sensor_key in deadbands:
+                sensor_config = {**sensor_config, "deadband": deadbands[sensor_key]}
+            sensors.append(EUCSensor(coordinator, entry, sensor_key, sensor_config))
+            added.add(sensor_key)
+        return sensors
+
+    firmware = coordinator.firmware
+
+    @callback
+    def async_capabilities_changed() -> None:
+        """Add sensors for new keys and record a firmware change."""
+        nonlocal firmware
+        if sensors := new_sensors(coordinator.capabilities):
+            async_add_entities(sensors)
+        if coordinator.firmware != firmware:
+            firmware = coordinator.firmware
+            device_registry = dr.async_get(hass)
+            if device := device_registry.async_get_device(
+                identifiers={(DOMAIN, entry.entry_id)}
+            ):
+                device_registry.async_update_device(
+                    device.id, sw_version=_sw_version(firmware)
+                )
+
+    entry.async_on_unload(
+        coordinator.async_add_capability_listener(async_capabilities_changed)
+    )
+
+    entities = new_sensors(FRAME_KEYS | coordinator.capabilities)
+
+    for sensor_key, sensor_config in DIAGNOSTIC_SENSOR_TYPES.items():
+        entities.append(
+            EUCDiagnosticSensor(coordinator, entry, sensor_key, sensor_config)
+        )
 
     async_add_entities(entities)
 
+    # Any wheel's platform can hold the fleet sensors; when it unloads they
+    # move to another one, without reloading that wheel
+    fleet: FleetManager = hass.data[FLEET_DATA_KEY]
+    fleet.aggregates.platforms[entry.entry_id] = async_add_entities
 
-class EUCSensor(CoordinatorEntity, SensorEntity):
+    @callback
+    def async_remove_fleet_platform() -> None:
+        """Hand the fleet sensors over to another wheel."""
+        aggregates = fleet.aggregates
+        del aggregates.platforms[entry.entry_id]
+        if aggregates.owner == entry.entry_id:
+            # Removed together with the platform
+            aggregates.owner = None
+            aggregates.entities = []
+        _async_update_fleet_sensors(hass, fleet)
+
+    entry.async_on_unload(async_remove_fleet_platform)
+    _async_update_fleet_sensors(hass, fleet)
+
+
+@callback
+def _async_update_fleet_sensors(hass: HomeAssistant, fleet: FleetManager) -> None:
+    """Keep the fleet sensors while more than one wheel is set up."""
+    aggregates = fleet.aggregates
+    if fleet.wheels > 1:
+        if aggregates.owner is None and aggregates.platforms:
+            owner, async_add_entities = next(iter(aggregates.platforms.items()))
+            aggregates.owner = owner
+            aggregates.entities = [
+                EUCFleetSensor(aggregates, sensor_key, sensor_config)
+                for sensor_key, sensor_config in FLEET_SENSOR_TYPES.items()
+            ]
+            async_add_entities(aggregates.entities)
+    elif aggregates.owner is not None:
+        # A single wheel has its own sensors, totals would only repeat them
+        for entity in aggregates.entities:
+            hass.async_create_task(entity.async_remove())
+        aggregates.owner = None
+        aggregates.entities = []
+
+
+def _sw_version(firmware: float | None) -> str | None:
+    """Return the firmware version as shown on the device."""
+    return None if firmware is None else f"{firmware:.3f}"
+
+
+class EUCSensor(CoordinatorEntity, RestoreSensor):
     """Representation of an EUC sensor."""
 
     def __init__(
@@ -50,6 +171,25 @@ class EUCSensor(CoordinatorEntity, SensorEntity):
             "enabled_default", True
         )
 
+        # State write filtering
+        self._deadband = sensor_config.get("deadband", 0)
+        self._deadband_rel = sensor_config.get("deadband_rel", 0)
+        self._min_interval = max(
+            sensor_config.get("min_interval", 0),
+            entry.options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+        )
+        self._heartbeat_interval = entry.options.get(
+            CONF_HEARTBEAT_INTERVAL, DEFAULT_HEARTBEAT_INTERVAL
+        )
+        self._written_value = None
+        self._written_available: bool | None = None
+        self._written_at = 0.0
+        # Timer writing a value held back by the filters once it is due
+        self._unsub_pending_write: CALLBACK_TYPE | None = None
+        self._pending_write_due = 0.0
+        # Last known value from before a restart, shown until fresh data arrives
+        self._restored_value = None
+
         # Set display precision for voltage sensors
         if "cell" in sensor_key or "voltage" in sensor_key:
             self._attr_suggested_display_precision = 2
@@ -60,17 +200,282 @@ class EUCSensor(CoordinatorEntity, SensorEntity):
             name=coordinator.device_name,
             manufacturer=MANUFACTURER,
             model=MODEL,
+            sw_version=_sw_version(coordinator.firmware),
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last known value and register for key updates."""
+        await super().async_added_to_hass()
+        if not self.coordinator.data and (
+            last_data := await self.async_get_last_sensor_data()
+        ):
+            self._restored_value = last_data.native_value
+        self.async_on_remove(
+            self.coordinator.async_add_key_listener(
+                self._sensor_key, self._handle_coordinator_update
+            )
+        )
+        self.async_on_remove(self._cancel_pending_write)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state now, or arm a timer for a change held back by the filters."""
+        stale = self._restored_value is not None
+        if stale and self.coordinator.data:
+            # Fresh data replaces the restored value
+            self._restored_value = None
+
+        value = self.native_value
+        available = self.available
+        now = time.monotonic()
+        if not stale and available == self._written_available:
+            due = self._write_due(value, now)
+            if due is None:
+                # Back at the written value, nothing left to write
+                self._cancel_pending_write()
+                return
+            if due > now:
+                self._schedule_pending_write(due, now)
+                return
+
+        self._cancel_pending_write()
+        self._written_value = value
+        self._written_available = available
+        self._written_at = now
+        self.async_write_ha_state()
+
+    def _write_due(self, value, now: float) -> float | None:
+        """Return when a changed value is due to be written, None if unchanged.
+
+        A change within the deadband is due at the heartbeat, any other
+        change once the minimum interval since the last write has passed.
+        """
+        last = self._written_value
+        if value == last:
+            return None
+        if not isinstance(value, (int, float)) or not isinstance(last, (int, float)):
+            return now
+
+        deadband = max(self._deadband, self._deadband_rel * abs(last))
+        if abs(value - last) < deadband:
+            return self._written_at + self._heartbeat_interval
+        return max(now, self._written_at + self._min_interval)
+
+    @callback
+    def _schedule_pending_write(self, due: float, now: float) -> None:
+        """Write the held back value at due unless a write comes first."""
+        if self._unsub_pending_write is not None:
+            if due == self._pending_write_due:
+                return
+            self._unsub_pending_write()
+        self._pending_write_due = due
+        self._unsub_pending_write = async_call_later(
+            self.hass, due - now, self._async_write_pending
         )
 
+    @callback
+    def _async_write_pending(self, _now: Any = None) -> None:
+        """Write the value held back by the filters."""
+        self._unsub_pending_write = None
+        self._handle_coordinator_update()
+
+    @callback
+    def _cancel_pending_write(self) -> None:
+        """Cancel the timer of a held back value."""
+        if self._unsub_pending_write is not None:
+            self._unsub_pending_write()
+            self._unsub_pending_write = None
+
     @property
     def native_value(self):
         """Return the state of the sensor."""
+        if self.coordinator.data:
+            return self.coordinator.data.get(self._sensor_key)
+        return self._restored_value
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        # Entity is available only if we have data from the device, or a
+        # restored value until the first data arrives
+        if self.coordinator.data is not None and len(self.coordinator.data) > 0:
+            return True
+        return self._restored_value is not None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Mark restored values as stale."""
+        if self._restored_value is not None:
+            return {"stale": True}
+        return None
+
+
+class EUCCellsSensor(CoordinatorEntity, SensorEntity):
+    """All cell voltages of one BMS, as raw millivolts in an attribute."""
+
+    # The summary sensors carry the history
+    _unrecorded_attributes = frozenset({"cells_mv"})
+
+    def __init__(
+        self,
+        coordinator: EUCDataUpdateCoordinator,
+        entry: ConfigEntry,
+        sensor_key: str,
+        sensor_config: dict,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._sensor_key = sensor_key
+        self._attr_name = f"EUC {sensor_config['name']}"
+        self._attr_unique_id = f"{entry.entry_id}_{sensor_key}"
+        self._attr_icon = sensor_config.get("icon")
+        self._attr_entity_registry_enabled_default = sensor_config.get(
+            "enabled_default", True
+        )
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=coordinator.device_name,
+            manufacturer=MANUFACTURER,
+            model=MODEL,
+            sw_version=_sw_version(coordinator.firmware),
+        )
+        self._written_cells: tuple[int, ...] | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Register for updates of this sensor's key."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_key_listener(
+                self._sensor_key, self._handle_coordinator_update
+            )
+        )
+
+    @property
+    def _cells(self) -> tuple[int, ...] | None:
+        """Return the raw cell millivolts of the last full BMS cycle."""
         if self.coordinator.data:
             return self.coordinator.data.get(self._sensor_key)
         return None
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state once per BMS cycle with changed cell voltages."""
+        cells = self._cells
+        if cells == self._written_cells:
+            return
+        self._written_cells = cells
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self):
+        """Return the number of cells reporting."""
+        if (cells := self._cells) is None:
+            return None
+        return sum(1 for cell in cells if cell > 0)
+
     @property
     def available(self) -> bool:
         """Return if entity is available."""
-        # Entity is available only if we have data from the device
-        return self.coordinator.data is not None and len(self.coordinator.data) > 0
+        return self._cells is not None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the raw cell millivolts."""
+        if (cells := self._cells) is None:
+            return None
+        return {"cells_mv": list(cells)}
+
+
+class EUCDiagnosticSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor backed by the coordinator's diagnostics."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(
+        self,
+        coordinator: EUCDataUpdateCoordinator,
+        entry: ConfigEntry,
+        sensor_key: str,
+        sensor_config: dict,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._sensor_key = sensor_key
+        self._attr_name = f"EUC {sensor_config['name']}"
+        self._attr_unique_id = f"{entry.entry_id}_{sensor_key}"
+        self._attr_native_unit_of_measurement = sensor_config.get("unit")
+        self._attr_icon = sensor_config.get("icon")
+        self._attr_device_class = sensor_config.get("device_class")
+        self._attr_state_class = sensor_config.get("state_class")
+        self._attr_entity_registry_enabled_default = sensor_config.get(
+            "enabled_default", True
+        )
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=coordinator.device_name,
+            manufacturer=MANUFACTURER,
+            model=MODEL,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Register for updates of this sensor's key."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_key_listener(
+                self._sensor_key, self._handle_coordinator_update
+            )
+        )
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        return self.coordinator.diagnostics.get(self._sensor_key)
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        # Link diagnostics stay meaningful while disconnected
+        return self.native_value is not None
+
+
+class EUCFleetSensor(SensorEntity):
+    """Total across all wheels, on the fleet device."""
+
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        aggregates: FleetAggregates,
+        sensor_key: str,
+        sensor_config: dict,
+    ) -> None:
+        """Initialize the sensor."""
+        self._aggregates = aggregates
+        self._sensor_key = sensor_key
+        self._attr_name = f"EUC {sensor_config['name']}"
+        self._attr_unique_id = f"{DOMAIN}_{FLEET_DEVICE_ID}_{sensor_key}"
+        self._attr_native_unit_of_measurement = sensor_config.get("unit")
+        self._attr_icon = sensor_config.get("icon")
+        self._attr_device_class = sensor_config.get("device_class")
+        self._attr_state_class = sensor_config.get("state_class")
+        self._attr_entity_registry_enabled_default = sensor_config.get(
+            "enabled_default", True
+        )
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, FLEET_DEVICE_ID)},
+            name="EUC Fleet",
+            manufacturer=MANUFACTURER,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Register for updates of this fleet total."""
+        self.async_on_remove(
+            self._aggregates.async_add_key_listener(
+                self._sensor_key, self.async_write_ha_state
+            )
+        )
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        return self._aggregates.data.get(self._sensor_key)
@@ -0,0 +1,447 @@
+"""Differential check of LynxDecoder against the frozen reference decoder.
+
+Feeds identical streams to lynx_reference.LynxDecoder, the decoder as it
+was before it was optimized, and to a candidate decoder and stops at the
+first frame where they disagree, printing the frame, the first differing
+field and both values.
+
+Usage: python diff_decoder.py [--frames N] [--seed N] [--keys summary]
+                              [--decoder FILE:CLASS] [--jobs N]
+                              [--capture FILE ...]
+
+tests/test_diff_decoder.py runs a short fixed-seed check under pytest.
+
+Without --capture the streams are generated: a simulated ride (see
+bench_decoder.py) and random frames with every length, firmware version,
+packet number and CRC the framing has to cope with, cut into chunks of
+random size. Captures recorded by the integration or by
+lynx_reader.py --capture are replayed notification by notification.
+
+The candidate is LynxDecoder unless --decoder names another class with
+the same feed() method. --keys summary restricts LynxDecoder to the keys
+of the default entities and compares only those. Exits with status 1 on
+the first difference.
+
+Generated streams are checked in segments of 100000 frames on --jobs
+processes, each segment seeded with --seed plus its index. A difference
+is reported with the seed of its segment, and
+--seed SEED --frames 100000 replays that segment alone.
+
+The reference output is normalised for the changes LynxDecoder makes on
+purpose, everything else has to match exactly:
+
+- SmartBMS cell voltages, temperatures and aggregates are published per
+  pack once packets 1, 2 and 3 (5, 6 and 7) arrived in one cycle, not as
+  each packet arrives. The cycles are followed from the cells and
+  temperatures the reference writes for each frame, a packet too short
+  to carry any of them does not count
+- bms1_cells and bms2_cells hold the cells of the last cycle as raw
+  millivolts, the reference has no such key
+- the pack voltage and average cell are summed in integer millivolts,
+  so they may differ from the reference's float sums in the last bits
+- a zero length byte drops the header; the reference waits for a frame
+  that can never complete
+- a 58 byte frame is one byte short of the sixth BMS temperature, its
+  temperatures are skipped; the reference reads five and raises
+"""
+import argparse
+import concurrent.futures
+import functools
+import importlib.util
+import math
+import os
+import random
+import struct
+import sys
+import time
+
+import bench_decoder
+import lynx_reference
+
+COMPONENT_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "custom_components", "euc_monitor"
+)
+# Firmware versions the random frames use: older firmware, SmartBMS
+# firmware, no version and nonsense
+RANDOM_VERSIONS = (4005, 4999, 5000, 5012, 6001, 0, -5012, 999, 32767)
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def random_frame(protocol, rng, cycle):
+    """Return one random frame, its CRC usually valid."""
+    if rng.random() < 0.05:
+        length = rng.randrange(4, 39)  # Too short to be decoded
+    else:
+        length = rng.choice((rng.randrange(39, 256), 44, 90, rng.randrange(43, 75)))
+    frame = bytearray(rng.randbytes(length))
+    frame[0:4] = protocol.FRAME_HEADER + bytes([length])
+    if length > 29 and rng.random() < 0.9:
+        frame[28:30] = rng.choice(RANDOM_VERSIONS).to_bytes(2, "big", signed=True)
+    if length > 46:
+        # Mostly complete packet cycles, so BMS values get published
+        frame[46] = cycle % 8 if rng.random() < 0.8 else rng.randrange(256)
+    crc = protocol.calculate_crc32(frame)
+    if rng.random() < 0.03:
+        crc ^= 1 << rng.randrange(32)
+    frame += protocol.CRC_STRUCT.pack(crc)
+    if rng.random() < 0.02:
+        # Noise, possibly part of a header
+        frame = bytes(rng.randrange(256) for _ in range(rng.randrange(1, 8))) + frame
+    if rng.random() < 0.005:
+        # Header with a zero length byte
+        frame = protocol.FRAME_HEADER + b"\x00" + frame
+    return bytes(frame)
+
+
+def random_chunks(protocol, count, seed):
+    """Yield random frames cut into chunks of random size."""
+    rng = random.Random(seed)
+    stream = bytearray()
+    for cycle in range(count):
+        stream += random_frame(protocol, rng, cycle)
+        while len(stream) > 300:
+            size = rng.randrange(1, 300)
+            yield bytes(stream[:size])
+            del stream[:size]
+    yield bytes(stream)
+
+
+def ride_chunks(protocol, count, seed):
+    """Yield a simulated ride at various frame lengths, cut into BLE chunks."""
+    rng = random.Random(seed)
+    for part in range(0, count, 10000):
+        frames = bench_decoder.generate_frames(
+            protocol,
+            min(10000, count - part),
+            rng.choice((4005, 5012)),
+            length=rng.choice((44, 54, 60, 75, 90, 100)),
+            seed=seed + part,
+        )
+        yield from bench_decoder.chunk_stream(
+            frames, rng.choice(bench_decoder.CHUNK_SIZES), 0.01, seed + part
+        )
+
+
+def capture_chunks(capture, paths):
+    """Yield the notifications of recorded captures."""
+    for path in paths:
+        with capture.CaptureReader(path) as reader:
+            for _timestamp, data in reader:
+                yield data
+
+
+STREAMS = {"ride": ride_chunks, "random": random_chunks}
+SEGMENT_FRAMES = 100000  # Frames per independently seeded segment
+
+
+@functools.cache
+def load_protocol():
+    path = os.path.join(COMPONENT_PATH, "lynx_protocol.py")
+    return load_module("lynx_protocol", path)
+
+
+@functools.cache
+def load_decoder(spec=None):
+    """Return the candidate decoder class, LynxDecoder by default."""
+    if spec is None:
+        return load_protocol().LynxDecoder
+    path, _, class_name = spec.rpartition(":")
+    return getattr(load_module("candidate", path), class_name)
+
+
+def summary_keys(protocol):
+    # Keys of the entities enabled by default
+    return protocol.FRAME_KEYS.union(
+        f"bms{bms}_{name}"
+        for bms in (1, 2)
+        for name in (*protocol.BMS_AGGREGATES, "current")
+    )
+
+
+class WriteLog(list):
+    """List of SmartBMS readings recording which items get written."""
+
+    def __init__(self, items):
+        super().__init__(items)
+        self.written = set()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        if isinstance(index, slice):
+            self.written.update(range(*index.indices(len(self))))
+        else:
+            self.written.add(index)
+
+
+class Reference(lynx_reference.LynxDecoder):
+    """The reference decoder, returning the values of every frame it decodes.
+
+    Each frame comes with the cells and temperatures the reference wrote
+    while decoding it, per pack, so the SmartBMS cycles can be followed
+    from what the reference did with the frame.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.bms1_cells = WriteLog(self.bms1_cells)
+        self.bms2_cells = WriteLog(self.bms2_cells)
+        self.bms1_temps = WriteLog(self.bms1_temps)
+        self.bms2_temps = WriteLog(self.bms2_temps)
+        self.decoded = []  # (frame, values, written) since the last feed()
+        self.frames_checked = 0  # Frames longer than 38 bytes, CRC checked
+        self.frames_decoded = 0
+
+    def _take_written(self):
+        """Return and forget the readings written, by pack."""
+        written = {}
+        for bms, cells, temps in (
+            (1, self.bms1_cells, self.bms1_temps),
+            (2, self.bms2_cells, self.bms2_temps),
+        ):
+            written[bms] = (frozenset(cells.written), bool(temps.written))
+            cells.written.clear()
+            temps.written.clear()
+        return written
+
+    @property
+    def crc_errors(self):
+        return self.frames_checked - self.frames_decoded
+
+    def feed(self, data):
+        self.process_data(data)
+        decoded, self.decoded = self.decoded, []
+        return decoded
+
+    def check_char(self, c):
+        super().check_char(c)
+        if self.state == "collecting" and self.len == 0:
+            # Normalised: a zero length byte drops the header
+            self.reset()
+
+    def reset(self):
+        if self.state == "done" and self.len > 38:
+            self.frames_checked += 1
+        super().reset()
+
+    def decode_frame(self, data):
+        temps = (self.bms1_temps[:], self.bms2_temps[:])
+        try:
+            super().decode_frame(data)
+        except struct.error:
+            if len(data) != 58:
+                raise
+            # Normalised: the temperatures of a 58 byte frame are skipped.
+            # Nothing else in the frame depends on its last byte.
+            self.bms1_temps[:], self.bms2_temps[:] = temps
+            self._take_written()
+            super().decode_frame(data[:57])
+        self.frames_decoded += 1
+        self.decoded.append((bytes(data), self.last_data, self._take_written()))
+
+
+REFERENCE_NUM_CELLS = 36  # Cells per pack the reference publishes
+# Pack voltage and average cell, summed differently by the two decoders
+SUM_KEYS = frozenset(
+    f"bms{bms}_{name}" for bms in (1, 2) for name in ("voltage", "avg_cell")
+)
+
+
+def pack_of(key):
+    """Return the pack of a cell, temperature or aggregate key, else None."""
+    if key.startswith(("bms1_", "bms2_")) and not key.endswith("_current"):
+        return int(key[3])
+    return None
+
+
+def normalize(values, written, cycles):
+    """Return the reference values of a frame as LynxDecoder publishes them.
+
+    written holds the cells and temperatures the reference wrote for the
+    frame, by pack. A cycle is the packets up to the one with the
+    temperatures, and is complete when cells 0-14 and 15-29 came in it.
+    cycles holds, per pack, the cell packets received in the current
+    cycle and the values published at the end of the last complete one.
+    It is updated from the frame.
+    """
+    if not any(pack_of(key) for key in values):
+        # No SmartBMS values before mVer 5
+        return values
+
+    for bms, (cells, temps) in written.items():
+        received, _published = cycles[bms]
+        # Packets are told apart by their first cell
+        received.update(index // 15 for index in cells if index % 15 == 0)
+        if temps:
+            if received.issuperset((0, 1)):
+                published = {
+                    key: value for key, value in values.items() if pack_of(key) == bms
+                }
+                published[f"bms{bms}_cells"] = tuple(
+                    round(values[f"bms{bms}_cell{i}"] * 1000)
+                    for i in range(REFERENCE_NUM_CELLS)
+                )
+                cycles[bms] = (received, published)
+            received.clear()
+
+    values = {key: value for key, value in values.items() if pack_of(key) is None}
+    values.update(cycles[1][1])
+    values.update(cycles[2][1])
+    return values
+
+
+def same_value(key, expected, actual):
+    if key in SUM_KEYS and isinstance(expected, float) and isinstance(actual, float):
+        return math.isclose(expected, actual, rel_tol=1e-12)
+    return expected == actual
+
+
+def first_difference(expected, actual):
+    """Return the first key with different values, sorted by key."""
+    missing = "<missing>"
+    for key in sorted(set(expected) | set(actual)):
+        want = expected.get(key, missing)
+        got = actual.get(key, missing)
+        if not same_value(key, want, got):
+            return key, want, got
+    return None
+
+
+def compare(chunks, decoder_spec=None, summary=False):
+    """Feed both decoders, return (frames, CRC errors, first difference).
+
+    The difference is None when the decoders agree on every frame.
+    """
+    protocol = load_protocol()
+    reference = Reference()
+    candidate = load_decoder(decoder_spec)()
+    keys = None
+    if summary:
+        keys = summary_keys(protocol)
+        candidate.set_keys(keys)
+
+    cycles = {1: (set(), {}), 2: (set(), {})}
+    frames = 0
+    for chunk in chunks:
+        expected = reference.feed(chunk)
+        try:
+            actual = candidate.feed(chunk)
+        except Exception as err:  # pylint: disable=broad-except
+            return frames, reference.crc_errors, (
+                f"frame {frames}: candidate raised {err!r}\n  chunk {chunk.hex()}"
+            )
+        if len(expected) != len(actual):
+            return frames, reference.crc_errors, (
+                f"frame {frames}: reference decoded {len(expected)} frames "
+                f"from a chunk, candidate {len(actual)}\n  chunk {chunk.hex()}"
+            )
+        for (frame, values, written), record in zip(expected, actual):
+            values = normalize(values, written, cycles)
+            if keys is not None:
+                values = {key: value for key, value in values.items() if key in keys}
+            record = record.as_dict() if hasattr(record, "as_dict") else dict(record)
+            difference = first_difference(values, record)
+            if difference is not None:
+                key, want, got = difference
+                return frames, reference.crc_errors, (
+                    f"frame {frames}: {key} is {got!r}, expected {want!r}\n"
+                    f"  frame {frame.hex()}"
+                )
+            frames += 1
+
+    crc_errors = getattr(candidate, "crc_errors", reference.crc_errors)
+    if crc_errors != reference.crc_errors:
+        return frames, reference.crc_errors, (
+            f"{crc_errors} CRC errors, expected {reference.crc_errors}"
+        )
+    return frames, reference.crc_errors, None
+
+
+def compare_segment(stream, seed, count, decoder_spec, summary):
+    """Compare the decoders on one generated segment."""
+    chunks = STREAMS[stream](load_protocol(), count, seed)
+    return compare(chunks, decoder_spec, summary)
+
+
+def report(name, frames, crc_errors, difference, elapsed):
+    """Print the outcome of one stream, return True if it passed."""
+    if difference is not None:
+        print(f"{name}: {difference}")
+        return False
+    print(
+        f"{name}: {frames} frames identical, {crc_errors} CRC errors, "
+        f"{frames / elapsed:.0f} frames/s"
+    )
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--frames", type=int, default=500000, help="Generated frames per stream"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the streams")
+    parser.add_argument(
+        "--keys", choices=("all", "summary"), default="all", help="Keys to decode"
+    )
+    parser.add_argument(
+        "--decoder", metavar="FILE:CLASS", help="Candidate decoder class to check"
+    )
+    parser.add_argument(
+        "--capture", metavar="FILE", nargs="+", help="Replay captures instead"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=os.cpu_count(), help="Processes to run"
+    )
+    args = parser.parse_args()
+    summary = args.keys == "summary"
+
+    if args.capture:
+        capture = load_module("capture", os.path.join(COMPONENT_PATH, "capture.py"))
+        start = time.perf_counter()
+        result = compare(capture_chunks(capture, args.capture), args.decoder, summary)
+        if not report("capture", *result, time.perf_counter() - start):
+            sys.exit(1)
+        return
+
+    # Generated streams are split into segments seeded seed, seed + 1, ...
+    # so a failing segment can be rerun on its own with --seed
+    passed = True
+    with concurrent.futures.ProcessPoolExecutor(max(args.jobs, 1)) as executor:
+        for stream in STREAMS:
+            start = time.perf_counter()
+            segments = [
+                (args.seed + i, min(SEGMENT_FRAMES, args.frames - part))
+                for i, part in enumerate(range(0, args.frames, SEGMENT_FRAMES))
+            ]
+            futures = [
+                executor.submit(
+                    compare_segment, stream, seed, count, args.decoder, summary
+                )
+                for seed, count in segments
+            ]
+            frames = crc_errors = 0
+            difference = None
+            for (seed, _count), future in zip(segments, futures):
+                segment_frames, segment_crc_errors, difference = future.result()
+                frames += segment_frames
+                crc_errors += segment_crc_errors
+                if difference is not None:
+                    difference = f"seed {seed}, {difference}"
+                    for other in futures:
+                        other.cancel()
+                    break
+            passed &= report(
+                stream, frames, crc_errors, difference, time.perf_counter() - start
+            )
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
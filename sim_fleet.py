@@ -0,0 +1,284 @@
+"""Simulation of wheels sharing BLE sessions through the fleet manager.
+
+Drives real EUCDataUpdateCoordinator instances, one per wheel, with their
+FleetManager, reconnect supervisor and advertisement wake-up. Only the
+Bluetooth side is faked: establish_connection returns a fake client that
+sends frames until it is disconnected, the wheels advertise while they
+are not connected, connection attempts fail now and then and links drop
+now and then. Needs Home Assistant installed, like the integration's
+development environment.
+
+Usage: python sim_fleet.py [--wheels N] [--slots N] [--duration S] [--seed N]
+
+Connected wheels start charging now and then, idle ones are rotated out
+and reconnect behind the waiting wheels. Half of the wheels are
+configured with more slots than --slots, so the lowest limit has to
+apply. Times are scaled down so a run takes a few seconds.
+
+The run fails, with exit status 1, if:
+    - more BLE connections are open than the session limit at any time
+    - a charging wheel is asked to yield its session
+    - a wheel never got a session, idle wheels have to take turns
+"""
+import argparse
+import asyncio
+import os
+import random
+import struct
+import sys
+import tempfile
+from unittest import mock
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "custom_components")
+)
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from euc_monitor import coordinator as coordinator_module  # noqa: E402
+from euc_monitor.fleet import FleetManager  # noqa: E402
+from euc_monitor.lynx_protocol import (  # noqa: E402
+    CRC_STRUCT,
+    FRAME_HEADER,
+    calculate_crc32,
+)
+
+IDLE_SESSION_TIME = 0.05  # Seconds, stands in for a minute
+ROTATE_INTERVAL = 0.01
+FRAME_INTERVAL = 0.005
+ADVERTISE_INTERVAL = 0.02
+CONNECT_TIME = (0.0, 0.005)  # Seconds establishing a connection takes
+CONNECT_FAIL_CHANCE = 0.1
+DROP_CHANCE = 0.001  # Chance per frame that the link drops
+ACTIVE_CHANCE = 0.1  # Chance a wheel is charging when it connects
+ACTIVE_TIME = (0.1, 0.4)  # Seconds a wheel keeps charging
+# Coordinator timings, scaled down like the fleet's
+COORDINATOR_TIMINGS = {
+    "RECONNECT_BACKOFF_MIN": 0.02,
+    "RECONNECT_BACKOFF_MAX": 0.5,
+    "CONNECT_TIMEOUT": 1,
+}
+
+
+def make_frame(charge_mode):
+    """Return a valid frame of a parked wheel, charging or not."""
+    frame = bytearray(44)
+    frame[0:4] = FRAME_HEADER + bytes([44])
+    struct.pack_into(">h", frame, 4, 10080)  # Voltage
+    struct.pack_into(">h", frame, 22, charge_mode)
+    struct.pack_into(">h", frame, 28, 4005)  # Firmware version
+    return bytes(frame) + CRC_STRUCT.pack(calculate_crc32(frame))
+
+
+IDLE_FRAME = make_frame(0)
+CHARGING_FRAME = make_frame(1)
+
+
+class FakeWheel:
+    """The radio side of one wheel: advertising, charging and its link."""
+
+    def __init__(self, address):
+        self.address = address
+        self.name = f"LK{address[-5:].replace(':', '')}"
+        self.client = None
+        self.active = False
+        self.sessions = 0
+
+
+class FakeClient:
+    """BLE client connected to a fake wheel, sending frames once subscribed."""
+
+    def __init__(self, air, wheel, disconnected_callback):
+        self.air = air
+        self.wheel = wheel
+        self.disconnected_callback = disconnected_callback
+        self.is_connected = True
+        self.services = mock.Mock()
+        self.services.get_characteristic.return_value.handle = 42
+        self._task = None
+
+    async def start_notify(self, _char_specifier, handler):
+        self._task = asyncio.get_running_loop().create_task(self._send(handler))
+
+    async def _send(self, handler):
+        wheel = self.wheel
+        while self.is_connected:
+            handler(None, bytearray(CHARGING_FRAME if wheel.active else IDLE_FRAME))
+            if self.air.rng.random() < DROP_CHANCE:
+                self.close()
+                return
+            await asyncio.sleep(FRAME_INTERVAL)
+
+    async def disconnect(self):
+        await asyncio.sleep(0)
+        self.close()
+        return True
+
+    async def clear_cache(self):
+        return True
+
+    def close(self):
+        """End the link, telling the client's owner like bleak does."""
+        if not self.is_connected:
+            return
+        self.is_connected = False
+        self.air.connections.discard(self)
+        self.wheel.client = None
+        self.disconnected_callback(self)
+
+
+class FakeAir:
+    """Fake Bluetooth stack, counting the connections open at any time."""
+
+    def __init__(self, wheels, limit, rng, errors):
+        self.wheels = {wheel.address: wheel for wheel in wheels}
+        self.limit = limit  # Lowest session limit of any wheel
+        self.rng = rng
+        self.errors = errors
+        self.connections = set()
+        self.advertisement_callbacks = {}
+        self.stopped = False
+
+    def async_register_callback(self, _hass, advertisement_callback, matcher, _mode):
+        self.advertisement_callbacks[matcher["address"]] = advertisement_callback
+        return lambda: self.advertisement_callbacks.pop(matcher["address"], None)
+
+    def async_address_present(self, _hass, address, connectable=True):
+        return address in self.wheels
+
+    def async_ble_device_from_address(self, _hass, address, connectable=True):
+        return self.wheels.get(address)
+
+    async def establish_connection(
+        self, _client_class, wheel, _name, disconnected_callback, **_kwargs
+    ):
+        await asyncio.sleep(self.rng.uniform(*CONNECT_TIME))
+        if self.stopped:
+            raise ConnectionError("Bluetooth adapter stopped")
+        if self.rng.random() < CONNECT_FAIL_CHANCE:
+            raise ConnectionError(f"GATT error connecting to {wheel.address}")
+        if wheel.client is not None:
+            self.errors.append(f"{wheel.address} connected twice")
+        client = FakeClient(self, wheel, disconnected_callback)
+        wheel.client = client
+        wheel.sessions += 1
+        self.connections.add(client)
+        if len(self.connections) > self.limit:
+            self.errors.append(
+                f"{len(self.connections)} connections open, limit {self.limit}"
+            )
+        # Some wheels are on the charger when they connect
+        if self.rng.random() < ACTIVE_CHANCE and self._may_become_active():
+            wheel.active = True
+            asyncio.get_running_loop().call_later(
+                self.rng.uniform(*ACTIVE_TIME), setattr, wheel, "active", False
+            )
+        return client
+
+    def _may_become_active(self):
+        # Keep a slot free for idle wheels, or none could ever rotate in
+        return sum(wheel.active for wheel in self.wheels.values()) < self.limit - 1
+
+    async def advertise(self):
+        """Advertise every wheel that is not connected, like a scanner sees."""
+        while True:
+            for address, wheel in self.wheels.items():
+                if wheel.client is None and address in self.advertisement_callbacks:
+                    self.advertisement_callbacks[address](None, None)
+            await asyncio.sleep(ADVERTISE_INTERVAL)
+
+
+class SimCoordinator(coordinator_module.EUCDataUpdateCoordinator):
+    """Coordinator checking that it is only asked to yield while idle."""
+
+    air = None
+
+    def async_yield_slot(self):
+        wheel = self.air.wheels[self.mac_address]
+        if wheel.active:
+            self.air.errors.append(f"{wheel.address} asked to yield while charging")
+        return super().async_yield_slot()
+
+
+async def simulate(wheel_count, slots, duration, seed):
+    """Run the wheels, return the fake wheels and the errors found."""
+    rng = random.Random(seed)
+    errors = []
+    wheels = [
+        FakeWheel(f"AA:BB:CC:DD:{i // 256:02X}:{i % 256:02X}")
+        for i in range(wheel_count)
+    ]
+    air = FakeAir(wheels, slots, rng, errors)
+    SimCoordinator.air = air
+
+    with tempfile.TemporaryDirectory() as config_dir, mock.patch.multiple(
+        coordinator_module,
+        establish_connection=air.establish_connection,
+        **COORDINATOR_TIMINGS,
+    ), mock.patch.multiple(
+        coordinator_module.bluetooth,
+        async_register_callback=air.async_register_callback,
+        async_address_present=air.async_address_present,
+        async_ble_device_from_address=air.async_ble_device_from_address,
+    ):
+        hass = HomeAssistant(config_dir)
+        fleet = FleetManager(IDLE_SESSION_TIME, ROTATE_INTERVAL)
+        coordinators = []
+        for i, wheel in enumerate(wheels):
+            coordinator = SimCoordinator(hass, wheel.address, {}, fleet)
+            fleet.register(coordinator, slots if i % 2 else slots + 2)
+            coordinators.append(coordinator)
+
+        loop = asyncio.get_running_loop()
+        tasks = [loop.create_task(c.async_start()) for c in coordinators]
+        tasks.append(loop.create_task(air.advertise()))
+        await asyncio.sleep(duration)
+
+        # The session limit rises as wheels are unregistered, connections
+        # made while tearing down are not checked against it
+        air.stopped = True
+        for coordinator in coordinators:
+            await coordinator.async_shutdown()
+            fleet.unregister(coordinator)
+        fleet.shutdown()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Let the disconnects scheduled on shutdown finish
+        await asyncio.sleep(FRAME_INTERVAL * 2)
+
+    for wheel in wheels:
+        if not wheel.sessions:
+            errors.append(f"{wheel.address} never got a session")
+    if air.connections or fleet.sessions:
+        errors.append(
+            f"{len(air.connections)} connections and {fleet.sessions} sessions "
+            "left after shutdown"
+        )
+    return wheels, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--wheels", type=int, default=40, help="Wheels simulated")
+    parser.add_argument("--slots", type=int, default=3, help="Session limit")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds to run")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the wheels")
+    args = parser.parse_args()
+
+    wheels, errors = asyncio.run(
+        simulate(args.wheels, args.slots, args.duration, args.seed)
+    )
+    sessions = [wheel.sessions for wheel in wheels]
+    print(
+        f"{args.wheels} wheels, {args.slots} slots: {sum(sessions)} sessions, "
+        f"{min(sessions)}-{max(sessions)} per wheel"
+    )
+    for error in errors[:20]:
+        print(error)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
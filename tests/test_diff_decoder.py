@@ -0,0 +1,23 @@
+"""Short differential check of LynxDecoder against the reference decoder.
+
+A bounded run of diff_decoder.py with a fixed seed, for CI. Longer runs
+and other seeds: python diff_decoder.py --frames N --seed N.
+"""
+import pytest
+
+import diff_decoder
+
+SEED = 0
+FRAMES = 3000  # Per stream, a few seconds each
+
+
+@pytest.mark.parametrize("summary", [False, True], ids=["all keys", "summary keys"])
+@pytest.mark.parametrize("stream", sorted(diff_decoder.STREAMS))
+def test_decoders_agree(stream, summary):
+    """LynxDecoder publishes what the reference does, as normalised."""
+    frames, _crc_errors, difference = diff_decoder.compare_segment(
+        stream, SEED, FRAMES, None, summary
+    )
+    assert difference is None
+    # Most frames make it through the noise and CRC errors
+    assert frames > FRAMES * 0.8